@@ -0,0 +1,39 @@
+# backend/actors.py
+
+import logging
+from collections import deque
+import eventlet
+
+log = logging.getLogger(__name__)
+
+class Actors:
+    """One inbox and one greenthread per key: a rid for room events, or a fixed key for cross-room state.
+
+    Events sent to the same key run one at a time in arrival order, so a handler that yields
+    (an emit, a search, a disk write) never lets another event for that key see its state half
+    changed. Different keys run concurrently and share no lock. A key's greenthread starts with
+    its first pending event and exits once its inbox is empty, so idle rooms cost nothing.
+    """
+
+    def __init__(self):
+        self.inboxes = {}  # key -> deque of (fn, args), present while its greenthread runs
+        self.stats = {"events": 0, "errors": 0, "max_depth": 0}
+
+    def send(self, key, fn, *args):
+        inbox = self.inboxes.get(key)
+        if inbox is None:
+            inbox = self.inboxes[key] = deque()
+            eventlet.spawn(self._run, key, inbox)
+        inbox.append((fn, args))
+        self.stats["max_depth"] = max(self.stats["max_depth"], len(inbox))
+
+    def _run(self, key, inbox):
+        while inbox:
+            fn, args = inbox.popleft()
+            self.stats["events"] += 1
+            try:
+                fn(*args)
+            except Exception:
+                self.stats["errors"] += 1
+                log.exception(f"Actor | key: {key} | failed in {fn.__name__}.")
+        del self.inboxes[key]
@@ -5,11 +5,23 @@ from eventlet.event import Event
 from eventlet.semaphore import Semaphore
 eventlet.monkey_patch()
 
-import os, math, json, time, base64, random, string, logging, threading
-from flask import Flask, jsonify, request, Response, make_response, send_from_directory
+import os, sys, json, time, atexit, random, signal, string, logging, itertools, threading
+from contextlib import contextmanager
+from flask import Flask, jsonify, request, Response, send_from_directory
 from flask_cors import CORS
 from flask_compress import Compress
-from flask_socketio import SocketIO, join_room, leave_room
+from flask_socketio import SocketIO
+import c4, rps, wire
+from pool import SearchPool
+from actors import Actors
+from bus import WORKERS, WORKER_INDEX, MemoryState, SocketState, BusManager, shard_of
+from store import JournalStore, Flusher, write_snapshot
+from history import History, ARCHIVE_AGE, ARCHIVE_BATCH
+from avatars import AvatarStore
+from assets import Asset
+from leaderboard import Leaderboard, TOP_SIZE
+from room import Room, Player, OUT, COLS
+from sessions import Sessions
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,96 +29,299 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S")
 log = logging.getLogger(__name__)
 
+boot_start = time.monotonic()
+boot_times = {}  # phase -> seconds, for /db/stats
+
+@contextmanager
+def boot_phase(name):
+    start = time.monotonic()
+    yield
+    boot_times[name] = round(time.monotonic() - start, 3)
+    log.info(f"Boot | {name} done in {boot_times[name]}s.")
+
 app = Flask(__name__)
 Compress(app)
 
 CORS(app, resources={r"/*": {"origins": "http://57.129.44.194:3001"}})
-socketio = SocketIO(app, cors_allowed_origins=["http://57.129.44.194:3001"], async_mode="eventlet")
+with boot_phase("bus"):
+    state = SocketState() if WORKERS > 1 else MemoryState()  # channel versions and room listings, shared by the workers
+    socketio = SocketIO(app, cors_allowed_origins=["http://57.129.44.194:3001"], async_mode="eventlet",
+        client_manager=BusManager(state, lambda message: receive(message)) if WORKERS > 1 else None)
+    if WORKERS > 1:
+        socketio.server.manager.start()
 file_lock = Semaphore(1)
+with boot_phase("search pool"):
+    search_pool = SearchPool(max(1, (os.cpu_count() or 1) // WORKERS))  # the cores are split between the workers
+actors = Actors()
 
-def load_json(file_path, default):
-    with file_lock:
-        try:
-            with open(file_path, "r") as f:
-                log.info(f"{file_path} loaded.")
-                return json.load(f)
-        except Exception as e:
-            log.error(f"Unable to read {file_path}: {e}")
-            return default
-
-def save_json(file_path, data):
+def save_json(file_path, data):  # raises on failure, for the flusher to log and retry
     with file_lock:
-        try:
-            with open(file_path, "w") as f:
-                json.dump(data, f, indent=4)
-            log.info(f"{file_path} saved.")
-        except Exception as e:
-            log.error(f"Unable to write {file_path}: {e}")
+        write_snapshot(file_path, data, default=lambda o: o.to_json())
+        log.info(f"{file_path} saved.")
 
 AVATAR_DIR = "db/avatars"
 PLAYERS_FILE = "db/players.json"
 ROOMS_HIST_FILE = {
     "rps": "db/rps_rooms_hist.json",
     "c4": "db/c4_rooms_hist.json"}
+WORKER_SUFFIX = f".{WORKER_INDEX}" if WORKERS > 1 else ""  # each worker saves the rooms and sockets it holds
 ROOMS_FILE = {
-    "rps": "db/rps_rooms.json",
-    "c4": "db/c4_rooms.json"}
-SIDNAME_FILE = "db/sid_pid.json"
-
-save_json(ROOMS_FILE["rps"], {})
-save_json(ROOMS_FILE["c4"], {})
-save_json(SIDNAME_FILE, {})
-
-avatars = [f for f in os.listdir(AVATAR_DIR) if f.endswith(".svg")]
-pid_player = load_json(PLAYERS_FILE, {})
-rooms_hist = {
-    "rps": load_json(ROOMS_HIST_FILE["rps"], {}),
-    "c4": load_json(ROOMS_HIST_FILE["c4"], {})}
+    "rps": f"db/rps_rooms{WORKER_SUFFIX}.json",
+    "c4": f"db/c4_rooms{WORKER_SUFFIX}.json"}
+SIDNAME_FILE = f"db/sid_pid{WORKER_SUFFIX}.json"
+PLAYERS_PAGE_SIZE = 1000
+PIDS_MAX = 100  # pids per /players/batch?pids= lookup
+PLAYERS_ACTOR = "players"  # actor key for pid_player, leaderboards and history, shared by all rooms
+PLAYERS_SHARD = 0  # worker running the players actor, the only one writing players.json and the history
+OWNS_PLAYERS = WORKER_INDEX == PLAYERS_SHARD
+ROUND_PAUSE = {"rps": 1, "c4": 3}  # seconds a round result stays up before the next round starts
+ARCHIVE_INTERVAL = 3600  # seconds between history archive runs, sooner while a backlog remains
+
+with boot_phase("files"):  # rooms and sockets do not outlive the process
+    save_json(ROOMS_FILE["rps"], {})
+    save_json(ROOMS_FILE["c4"], {})
+    save_json(SIDNAME_FILE, {})
+
+journals = {PLAYERS_FILE: JournalStore(PLAYERS_FILE)}
+with boot_phase("history"):  # pages are read from SQLite on demand, an old JSON dataset is imported after boot
+    history = History()
+
+with boot_phase("avatars"):
+    avatar_store = AvatarStore(AVATAR_DIR)
+with boot_phase("players"):
+    pid_player = journals[PLAYERS_FILE].load(compact=OWNS_PLAYERS)  # a copy on the other workers, kept up to date by sync_players
 rooms = {"rps": {}, "c4": {}}
+with boot_phase("indexes"):
+    leaderboards = {gid: Leaderboard(gid).build(pid_player) for gid in rooms}
+    name_pid = {p["n"]: pid for pid, p in pid_player.items()}
+pid_rooms = {}  # pid -> {(gid, rid)} of the rooms they are in
+open_rooms = {gid: {"waiting": set(), "running": set()} for gid in rooms}  # rids by status
+room_timers = {}  # rid -> pending round transition
 sid_pid = {}
+sid_codec = {}  # sid -> wire.CODEC for clients that asked for the binary encoding
+pid_sids = {}  # pid -> sids connected as that player, on every worker
+sessions = Sessions(lambda expired: expire_sessions(expired))  # disconnected players -> the seats they keep on this worker
+
+DATASETS = {PLAYERS_FILE: ("players", None), **{f: ("rooms", gid) for gid, f in ROOMS_FILE.items()}}
+players_pages = {}  # (offset, limit) -> Asset, dropped whenever pid_player changes
+
+flusher = Flusher(journals, save_json)
+atexit.register(flusher.close)
+atexit.register(history.close)
+signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+def has_members(room):  # with several workers the members may be on another one
+    return WORKERS > 1 or bool(socketio.server.manager.rooms.get("/", {}).get(room))
+
+def emit_room(event, data, room, binary=None):  # once per codec in use in the room, binary clients sit in room + wire.SUFFIX
+    if has_members(room):  # binary: what to encode for them instead of data, live rooms rather than their to_json()
+        socketio.emit(event, data, room=room)
+    if has_members(room + wire.SUFFIX):
+        socketio.emit(event, wire.encode(data if binary is None else binary), room=room + wire.SUFFIX)
+
+def emit_sid(event, data, sid):
+    socketio.emit(event, wire.encode(data) if sid_codec.get(sid) == wire.CODEC else data, room=sid)
+
+def join_channel(channel, sid):  # no request context needed, actors run outside of it
+    socketio.server.enter_room(sid, channel + wire.SUFFIX if sid_codec.get(sid) == wire.CODEC else channel, namespace="/")
+
+def leave_channel(channel, sid):
+    socketio.server.leave_room(sid, channel, namespace="/")
+    socketio.server.leave_room(sid, channel + wire.SUFFIX, namespace="/")
+
+def on_actor(event, key=lambda data: data.get("rid")):
+    """Registers handler(data, sid) for a socket event, run by the actor key(data) names, the event's room by default."""
+    def register(handler):
+        socketio.on(event)(lambda data: route(key(data), handler, data, request.sid))
+        return handler
+    return register
+
+def route(key, fn, *args):  # fn(*args) in the actor of key, on the worker owning it
+    owner = PLAYERS_SHARD if key == PLAYERS_ACTOR else shard_of(key) if key else WORKER_INDEX
+    if owner == WORKER_INDEX:
+        actors.send(key, fn, *args)
+    else:
+        forward(owner, key, fn, *args)
+
+def broadcast(fn, *args):  # fn(*args) here, then on every other worker
+    fn(*args)
+    if WORKERS > 1:
+        forward("*", None, fn, *args)
 
-def update_db(filename, data):
-    key = filename.split("/")[-1].split(".")[0]
-    key = next((k for k in ["rooms_hist", "rooms", "players"] if k in key), key)
-    socketio.emit("db_updated", {"key": key, "data": data})
-    save_json(filename, data)
+def forward(to, key, fn, *args):  # to: a worker index or "*" for all the others, args must be JSON
+    state.publish({"method": "forward", "from": WORKER_INDEX, "to": to, "key": key, "fn": fn.__name__, "args": args})
 
-def clean_room_from_player(gid, rid, pid):
+def receive(message):  # a forward from another worker, see BusManager
+    fn = FORWARDED[message["fn"]]
+    if message["key"] is None:
+        fn(*message["args"])
+    else:
+        actors.send(message["key"], fn, *message["args"])
+
+def bind_sid(sid, pid, codec):  # run by every worker, so an event forwarded with a sid finds its pid and codec
+    old = sid_pid.get(sid)
+    if old and old != pid:
+        pid_sids[old].discard(sid)
+        if not pid_sids[old]:
+            del pid_sids[old]
+    if pid:
+        pid_sids.setdefault(pid, set()).add(sid)
+    for table, value in [(sid_pid, pid), (sid_codec, codec)]:
+        if value:
+            table[sid] = value
+        else:
+            table.pop(sid, None)
+    flusher.mark(SIDNAME_FILE, sid_pid)
+
+def publish(channel, key, gid, data, keys, live=None):  # live: the objects data was built from, encoded as they are for binary clients
+    v = state.incr(channel)  # patches published on the channel, so clients can spot a missed one and resync
+    removed = [k for k in keys if k not in data]
+    binary = None if live is None else {"channel": channel, "key": key, "gid": gid, "v": v,
+        "set": {k: live[k] for k in keys if k in live}, "del": removed}
+    emit_room("db_updated", {"channel": channel, "key": key, "gid": gid, "v": v,
+        "set": {k: data[k] for k in keys if k in data}, "del": removed}, channel, binary)
+
+def update_db(filename, data, keys, stats=False):  # keys: top-level keys changed, published as patches and appended to the journal if any
+    key, gid = DATASETS[filename]
+    if key == "rooms":
+        snapshot = {rid: data[rid].to_json() for rid in keys if rid in data}  # once for the lobby and room patches
+        for rid in keys:
+            if rid in data:
+                state.hset(f"rooms:{gid}", rid, data[rid])
+            else:
+                state.hdel(f"rooms:{gid}", rid)
+        publish(f"lobby:{gid}", key, gid, snapshot, keys, data)
+        for rid in keys:
+            publish(f"room:{rid}", key, gid, snapshot, [rid], data)
+            if rid not in data:
+                state.delete(f"room:{rid}")
+    else:  # names and avatars go to everybody, game stats only to the players' own channels
+        players_pages.clear()
+        if not stats:
+            publish("players", key, gid, data, keys)
+        for pid in keys:
+            publish(f"player:{pid}", key, gid, data, [pid])
+        if WORKERS > 1:
+            forward("*", None, sync_players, {pid: data[pid] for pid in keys})
+        if not OWNS_PLAYERS:
+            return
+    flusher.mark(filename, data, keys)
+
+def sync_players(records):  # players changed on another worker, merged into this worker's copy
+    for pid, fields in records.items():
+        record = pid_player.setdefault(pid, {})
+        if record.get("n") and name_pid.get(record["n"]) == pid:
+            del name_pid[record["n"]]
+        record.update(fields)
+        if record.get("n"):
+            name_pid[record["n"]] = pid
+        for gid in leaderboards:
+            if gid in fields:
+                leaderboards[gid].update(pid, record[gid])
+    players_pages.clear()
+    if OWNS_PLAYERS:
+        flusher.mark(PLAYERS_FILE, pid_player, list(records))
+
+def channel_data(channel):
+    kind, _, arg = channel.partition(":")
+    if kind == "lobby" and arg in rooms:  # rooms of every worker
+        return "rooms", arg, state.hgetall(f"rooms:{arg}"), True
+    if kind == "room" and arg:
+        gid, room = next(((g, r) for g in rooms if (r := state.hget(f"rooms:{g}", arg))), (None, None))
+        return "rooms", gid, {arg: room} if gid else {}, False
+    if kind == "players" and not arg:  # patches only, clients look up the players they show via /players/batch?pids=
+        return "players", None, {}, False
+    if kind == "leaderboard" and arg in leaderboards:
+        return "lead", arg, lead_entries(arg), True
+    if kind == "player" and arg:
+        return "players", None, {arg: pid_player[arg]} if arg in pid_player else {}, False
+
+def lead_entries(gid):
+    return {pid: {k: pid_player[pid][gid][k] for k in ["r", "w", "l"]} for pid in leaderboards[gid].top()}
+
+def clean_room_from_player(gid, rid, pid, sid=None):
     if rid not in rooms[gid]:
         log.warning(f"Invalid room {rid}.")
         return
     
     room = rooms[gid][rid]
-    if pid not in room["players"]:
+    if pid not in room.players:
         log.warning(f"Player | pid: {pid:>10} | is not in room | rid: {rid}.")
         return
 
-    del room["players"][pid]
-    leave_room(rid)
+    remove_player(gid, rid, pid)
+    if sid:
+        leave_channel(rid, sid)
     log.info(f"Player | pid: {pid:>10} | left room | rid: {rid}")
-    if room["status"] != "waiting" and all(v["is_ai"] for v in room["players"].values()):
-        del rooms[gid][rid]
+    close_if_abandoned(gid, rid)
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
+
+def close_if_abandoned(gid, rid):
+    room = rooms[gid][rid]
+    if room.status != "waiting" and all(v.is_ai for v in room.players.values()):
+        remove_room(gid, rid)
         log.info(f"Deleted room {rid} due to insufficient players.")
-    elif room["status"] == "waiting" and len(room["players"]) == 0:
-        del rooms[gid][rid]
+    elif room.status == "waiting" and len(room.players) == 0:
+        remove_room(gid, rid)
         log.info(f"Deleted empty room {rid}.")
 
-def clean_rooms_from_player(pid):
-    rooms_to_delete = []
-    for gid in rooms:
-        for rid, room in rooms[gid].items():
-            if pid in room["players"]:
-                del room["players"][pid]
-                leave_room(rid)
-                log.info(f"Player | pid: {pid:>10} | left room | rid: {rid}")
-                if room["status"] != "waiting" and all(v["is_ai"] for v in room["players"].values()):
-                    rooms_to_delete.append(rid)
-                elif room["status"] == "waiting" and len(room["players"]) == 0:
-                    rooms_to_delete.append(rid)
-    
-        for rid in rooms_to_delete:
-            del rooms[gid][rid]
-            log.info(f"Deleted room {rid}.")
+def clean_rooms_from_player(pid, keep=None, sid=None):  # keep: the (gid, rid) being joined
+    broadcast(leave_rooms, pid, keep, sid)
+
+def leave_rooms(pid, keep, sid):  # the rooms of this worker drop the player, each in its own actor
+    keep = tuple(keep) if keep else None
+    for gid, rid in sorted(pid_rooms.get(pid, set()) - {keep}):
+        actors.send(rid, clean_room_from_player, gid, rid, pid, sid)
+
+def suspend_player(pid):  # run by every worker once the player's last socket is gone: their seats here wait for them
+    seats = sorted(pid_rooms.get(pid, set()))
+    if not seats or pid_sids.get(pid):  # or they reconnected before this came through
+        return
+    sessions.suspend(pid, seats)
+    for gid, rid in seats:
+        actors.send(rid, set_away, gid, rid, pid, True)
+
+def resume_player(pid, sid):  # run by every worker on set_pid: the player's rooms here take the new socket
+    sessions.resume(pid)
+    for gid, rid in sorted(pid_rooms.get(pid, set())):
+        actors.send(rid, rejoin_room, gid, rid, pid, sid)
+
+def expire_sessions(expired):  # a wheel slot of sessions, one event per room however many of its players are gone
+    pids_by_room = {}
+    for pid, seats in expired.items():
+        for seat in seats:
+            pids_by_room.setdefault(seat, []).append(pid)
+    for (gid, rid), pids in pids_by_room.items():
+        actors.send(rid, give_up_seats, gid, rid, pids)
+
+def set_away(gid, rid, pid, away):
+    room = rooms[gid].get(rid)
+    if room is None or pid not in room.players or room.players[pid].away == away:
+        return
+    room.players[pid].away = away
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
+
+def rejoin_room(gid, rid, pid, sid):  # the room's events go to the new socket, which gets this room's state and nothing else
+    room = rooms[gid].get(rid)
+    if room is None or pid not in room.players:
+        return
+    join_channel(rid, sid)
+    set_away(gid, rid, pid, False)
+    emit_sid("session_resumed", {"gid": gid, "rid": rid, "room": room.to_json()}, sid)
+    log.info(f"Player | pid: {pid:>10} | resumed in room | rid: {rid}.")
+
+def give_up_seats(gid, rid, pids):  # their grace period ran out
+    room = rooms[gid].get(rid)
+    if room is None:
+        return
+    gone = [pid for pid in pids if pid in room.players and room.players[pid].away and not pid_sids.get(pid)]
+    if not gone:
+        return
+    for pid in gone:
+        remove_player(gid, rid, pid)
+        log.info(f"Player | pid: {pid:>10} | did not come back to room | rid: {rid}.")
+    close_if_abandoned(gid, rid)
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
 def generate_random_name():
     adjectives = ["Brave", "Clever", "Swift", "Mighty", "Bold"]
@@ -126,157 +341,260 @@ def check_rid(gid, rid, pid, sid, ep):
     log.warning(f"[Endpoint: {ep}] Player | sid: {sid} | pid: {pid:>10} | tried to interact with invalid room | rid: {rid}.")
 
 def check_pid_in_room(gid, rid, pid, sid, ep):
-    if pid in rooms[gid][rid]["players"]:
+    if pid in rooms[gid][rid].players:
         return True
     socketio.emit("warning", {"message": f"You are not in room {rid}"}, room=sid)
     log.warning(f"[Endpoint: {ep}] Player | sid: {sid} | pid: {pid:>10} | tried to interact with room | rid: {rid} | but is not in it.")
 
-# blackbox fun
-def get_result(player_move):
-    rules = {"R": "S", "P": "R", "S": "P"}
-    if len(unique_moves := set(player_move.values())) == 1:
-        return list(player_move.keys())
-    beaten_by = {move: {m for m, beats in rules.items() if beats == move} for move in unique_moves}
-    winning_moves = {move for move in unique_moves if not beaten_by[move] & unique_moves}
-    return list(player_move.keys()) if not winning_moves else [
-        player for player, move in player_move.items() if move in winning_moves]
+def set_room_status(gid, rid, status):
+    room = rooms[gid][rid]
+    open_rooms[gid].get(room.status, set()).discard(rid)
+    room.status = status
+    open_rooms[gid][status].add(rid)
+
+def unindex_player(gid, rid, pid):
+    entries = pid_rooms.get(pid)
+    if entries is not None:
+        entries.discard((gid, rid))
+        if not entries:
+            del pid_rooms[pid]
+
+def remove_player(gid, rid, pid):
+    del rooms[gid][rid].players[pid]
+    unindex_player(gid, rid, pid)
+
+def remove_room(gid, rid):
+    room = rooms[gid].pop(rid)
+    for pid in room.players:
+        unindex_player(gid, rid, pid)
+    open_rooms[gid][room.status].discard(rid)
+    if timer := room_timers.pop(rid, None):
+        timer.cancel()
+    search_pool.cancel(rid)
+
+def check_indexes():
+    """Rebuilds the reverse indexes from rooms, sid_pid and pid_player and returns what differs, empty when consistent."""
+    problems = []
+    expected_pid_rooms = {}
+    for gid in rooms:
+        for rid, room in rooms[gid].items():
+            for pid in room.players:
+                expected_pid_rooms.setdefault(pid, set()).add((gid, rid))
+        for status, rids in open_rooms[gid].items():
+            expected = {rid for rid, room in rooms[gid].items() if room.status == status}
+            if rids != expected:
+                problems.append(f"open_rooms[{gid}][{status}]: {sorted(rids ^ expected)}")
+    if pid_rooms != expected_pid_rooms:
+        problems.append(f"pid_rooms: {sorted(k for k in pid_rooms.keys() | expected_pid_rooms.keys() if pid_rooms.get(k) != expected_pid_rooms.get(k))}")
+    expected_pid_sids = {}
+    for sid, pid in sid_pid.items():
+        expected_pid_sids.setdefault(pid, set()).add(sid)
+    if pid_sids != expected_pid_sids:
+        problems.append(f"pid_sids: {sorted(k for k in pid_sids.keys() | expected_pid_sids.keys() if pid_sids.get(k) != expected_pid_sids.get(k))}")
+    expected_names = {p["n"]: pid for pid, p in pid_player.items()}
+    if name_pid.keys() != expected_names.keys():
+        problems.append(f"name_pid: {sorted(name_pid.keys() ^ expected_names.keys())}")
+    for problem in problems:
+        log.error(f"Index mismatch | {problem}")
+    return problems
 
 def add_room(gid, rid, pid, status):
-
-    if gid == "rps":
-        rooms[gid][rid] = {"status": status, "wins2win": 2, "rsize": 2, "max_spec": 0, "spec": [],
-            "players": {}, "rounds": [{"index": 1, "winner": None, "steps": []}]}
-    elif gid == "c4":
-        rooms[gid][rid] = {"status": status, "wins2win": 2, "rsize": 2, "max_spec": 0, "spec": [],
-            "players": {}, "rounds": [{"index": 1, "winner": None, "moves": []}],
-            "grid": [[0 for _ in range(7)] for _ in range(6)]}
+    rooms[gid][rid] = Room(gid, status)
+    open_rooms[gid][status].add(rid)
 
     log.info(f"Player | pid: {pid:>10} | created new room | rid: {rid}")
 
 def add_player(gid, rid, pid, is_ai, status):
     room = rooms[gid][rid]
-    if pid not in room["players"]:
-        name = pid_player[pid]["n"]
-        avatar = pid_player[pid]["a"]
-
-        if gid == "rps":
-            room["players"][pid] = {"team": len(room["players"]) + 1, "is_ai": is_ai, "status": status, "on": True, "cmove": None, "w": 0, "l": 0}
-        elif gid == "c4":
-            room["players"][pid] = {"team": len(room["players"]) + 1, "is_ai": is_ai, "status": status, "w": 0, "l": 0}
+    if pid not in room.players:
+        room.players[pid] = Player(gid, len(room.players) + 1, is_ai, status)
+        pid_rooms.setdefault(pid, set()).add((gid, rid))
 
-        update_db(ROOMS_FILE[gid], rooms[gid])
-    if len(room["players"]) != 1:
+        update_db(ROOMS_FILE[gid], rooms[gid], [rid])
+    if len(room.players) != 1:
         log.info(f"{'AI' if is_ai else 'Player'} | pid: {pid:>10} | joined room | rid: {rid}.")
 
 def add_round(gid, rid, rwinner, cwinner):
-    room = rooms[gid][rid]
-
     emit_data = {"rid": rid, "game_over": False, "winner": rwinner}
 
     if gid == "rps":
-        socketio.emit("game_result_rps", emit_data, room=rid)
-        update_db(ROOMS_FILE[gid], rooms[gid])
-        time.sleep(1)
+        emit_room("game_result_rps", emit_data, rid)
     elif gid == "c4":
-        socketio.emit("game_result_c4", emit_data, room=rid)
-        update_db(ROOMS_FILE[gid], rooms[gid])
-        time.sleep(3)
+        emit_room("game_result_c4", emit_data, rid)
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
+    room_timers[rid] = eventlet.spawn_after(ROUND_PAUSE[gid], actors.send, rid, start_round, gid, rid, rwinner, cwinner)
+
+def start_round(gid, rid, rwinner, cwinner):  # queued ROUND_PAUSE after add_round
+    if room_timers.pop(rid, None) is None:  # room removed since
+        return
+    room = rooms[gid][rid]
 
     if gid == "rps":
-        for v in room["players"].values():
-            v["on"] = True
-        room["rounds"].append({"index": len(room["rounds"]) + 1, "winner": None, "steps": []})
-    elif gid == "c4":
-        room["rounds"].append({"index": len(room["rounds"]) + 1, "winner": None, "moves": []})
-        room["grid"] = [[0 for _ in range(7)] for _ in range(6)]
+        for v in room.players.values():
+            v.on = True
+    room.new_round()
 
     emit_data = {"rid": rid, "game_over": False, "winner": rwinner}
 
     if gid == "rps":
-        socketio.emit("game_result_rps", emit_data, room=rid)
+        emit_room("game_result_rps", emit_data, rid)
     elif gid == "c4":
-        socketio.emit("game_result_c4", emit_data, room=rid)
+        emit_room("game_result_c4", emit_data, rid)
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
     log.info(f"New round in room {rid}. Current status: {cwinner} wins.")
 
 def game_over(gid, rid):
     room = rooms[gid][rid]
-    winner = max(room["players"], key=lambda x: room["players"][x]["w"])
-    room["winner"] = winner
+    winner = max(room.players, key=lambda x: room.players[x].w)
+    room.winner = winner
     log.info(f"Game over in room {rid}. Winner: {winner}")
 
-    for k in room["players"]:
-        pstats = pid_player[k].setdefault(gid, {})
-        for stat in ["w", "l"]:
-            pstats.setdefault(stat, 0)
-            pstats[stat] += room["players"][k].get(stat, 0)
-        tot = pstats["w"] + pstats["l"]
-        pstats["r"] = round((pstats["w"] / tot) * 100, 2) if tot > 0 else 0.0
-    update_db(PLAYERS_FILE, pid_player)
+    saved_room = {
+        "date": int(time.time()), "max_spec": room.max_spec,
+        "players": {key: {"team": v.team, "is_ai": v.is_ai, "w": v.w, "l": v.l} for key, v in room.players.items()},
+        "rounds": [r.to_json() for r in room.rounds]}
+
+    route(PLAYERS_ACTOR, save_game, gid, rid, saved_room)
+    for channel in [f"room:{rid}", *(f"player:{k}" for k in room.players)]:
+        publish(channel, "rooms_hist", gid, {rid: saved_room}, [rid])
 
     emit_data = {"rid": rid, "game_over": True, "winner": winner}
 
     if gid == "rps":
-        socketio.emit("game_result_rps", emit_data, room=rid)
+        emit_room("game_result_rps", emit_data, rid)
     elif gid == "c4":
-        socketio.emit("game_result_c4", emit_data, room=rid)
+        emit_room("game_result_c4", emit_data, rid)
 
-    saved_room = {
-        "date": int(time.time()), "max_spec": room["max_spec"],
-        "players": {key: {k: v[k] for k in ["team", "is_ai", "w", "l"]} for key, v in room["players"].items()}}
+    remove_room(gid, rid)
+    log.info(f"Room {rid} data saved and removed from active rooms.")
 
-    if gid == "rps":
-        saved_room["rounds"] = [{"index": r["index"], "winner": r["winner"], "steps": r["steps"]} for r in room["rounds"]]
-    elif gid == "c4":
-        saved_room["rounds"] = [{"index": r["index"], "winner": r["winner"], "moves": r["moves"]} for r in room["rounds"]]
+def save_game(gid, rid, saved_room):  # run by the players actor: stats, leaderboard and history are shared by all rooms
+    players = saved_room["players"]
+    top_before = set(leaderboards[gid].top())
+    for k in players:
+        pstats = pid_player[k].setdefault(gid, {})
+        for stat in ["w", "l"]:
+            pstats.setdefault(stat, 0)
+            pstats[stat] += players[k].get(stat, 0)
+        tot = pstats["w"] + pstats["l"]
+        pstats["r"] = round((pstats["w"] / tot) * 100, 2) if tot > 0 else 0.0
+        leaderboards[gid].update(k, pstats)
+    update_db(PLAYERS_FILE, pid_player, list(players), stats=True)
+    top = lead_entries(gid)
+    publish(f"leaderboard:{gid}", "lead", gid, top, list(top_before ^ top.keys() | players.keys() & top.keys()))
+    history.add(gid, rid, saved_room)
 
-    rooms_hist[gid][rid] = saved_room
-    update_db(ROOMS_HIST_FILE[gid], rooms_hist[gid])
-    del rooms[gid][rid]
-    log.info(f"Room {rid} data saved and removed from active rooms.")
+def migrate_history():  # run by the players actor once booted, games of an old dataset show up once imported
+    for gid, path in ROOMS_HIST_FILE.items():
+        history.migrate_json(gid, path)
+
+def archive_history():  # run by the players actor, in batches so games keep being saved in between
+    moved = history.archive(int(time.time()) - ARCHIVE_AGE)
+    eventlet.spawn_after(1 if moved == ARCHIVE_BATCH else ARCHIVE_INTERVAL, actors.send, PLAYERS_ACTOR, archive_history)
 
 def check_round_and_game_over(gid, rid, room, rwinner):
     if rwinner:
-        room["rounds"][-1]["winner"] = rwinner
-        room["players"][rwinner]["w"] += 1
-        for k in room["players"]:
+        room.rounds[-1].winner = rwinner
+        room.players[rwinner].w += 1
+        for k in room.players:
             if k != rwinner:
-                room["players"][k]["l"] += 1
+                room.players[k].l += 1
 
-    cwinner = max(room["players"], key=lambda x: room["players"][x]["w"])
-    if room["players"][cwinner]["w"] != room["wins2win"]:
+    cwinner = max(room.players, key=lambda x: room.players[x].w)
+    if room.players[cwinner].w != room.wins2win:
         add_round(gid, rid, rwinner, cwinner)
     else:
         game_over(gid, rid)
 
-@app.route("/avatars/batch")
-def get_all_avatars():
-    avatar_data = {}
-    for avatar_name in avatars:
-        avatar_path = os.path.join(AVATAR_DIR, avatar_name)
-        with open(avatar_path, "r", encoding="utf-8") as f:
-            svg_content = f.read()
-            encoded_svg = base64.b64encode(svg_content.encode("utf-8")).decode("utf-8")
-            avatar_data[avatar_name] = f"data:image/svg+xml;base64,{encoded_svg}"
-    tot = len([e for e in os.listdir(AVATAR_DIR) if e.endswith(".svg")])
-    if len(avatar_data) == tot:
-        log.info(f"Batch avatars fetched {len(avatar_data)}/{tot}")
+def send_asset(asset, cache_control):  # prebuilt body, gzipped here so Flask-Compress leaves it alone
+    gz = "gzip" in request.headers.get("Accept-Encoding", "")
+    etag = f"{asset.etag}-gz" if gz else asset.etag
+    if etag in request.if_none_match:
+        response = Response(status=304)
     else:
-        log.warning(f"Batch avatars not full, fetched {len(avatar_data)}/{tot}")
-
-    response = make_response(jsonify(avatar_data), 200)
-    # response.headers["Cache-Control"] = "public, max-age=86400"
-    response.headers["Cache-Control"] = "no-cache"
+        response = Response(asset.gzip if gz else asset.body, status=200, mimetype=asset.mimetype)
+        if gz:
+            response.headers["Content-Encoding"] = "gzip"
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = "Accept-Encoding"
     return response
 
+@app.route("/avatars/batch")
+def get_all_avatars():  # name -> immutable avatar URL, revalidated on each visit
+    avatar_store.refresh()
+    return send_asset(avatar_store.bundle, "no-cache")
+
+@app.route("/avatars/<digest>/<name>")
+def get_avatar(digest, name):
+    asset = avatar_store.get(name)
+    if not asset or asset.etag != digest:
+        return jsonify({"error": f"Unknown avatar: {name}"}), 404
+    return send_asset(asset, "public, max-age=31536000, immutable")
+
+@app.route("/db/stats")
+def get_db_stats():
+    return jsonify({**flusher.get_stats(), "rooms": {gid: {k: len(v) for k, v in open_rooms[gid].items()} for gid in rooms},
+        "actors": {**actors.stats, "busy": len(actors.inboxes)}, "worker": WORKER_INDEX, "boot": boot_times,
+        "sessions": {**sessions.stats, "away": len(sessions)}})
+
 @app.route("/rooms/batch")
 def get_rooms_batch():  # not jsonifying here to keep original order for players
+    args = request.args
+    gid = args.get("gid")
+    if gid not in ROOMS_HIST_FILE:
+        return jsonify({"error": f"Unknown gid: {gid}"}), 400
+    try:
+        games, next_cursor = history.page(gid,
+            limit=args.get("limit", 50, type=int),
+            cursor=args.get("cursor"),
+            player=args.get("player"),
+            since=args.get("since", type=int),
+            until=args.get("until", type=int),
+            has_ai=args.get("has_ai", type=lambda v: v.lower() in ["1", "true"]))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return Response(json.dumps({"rooms": dict(games), "next": next_cursor}), status=200, mimetype='application/json')
+
+@app.route("/leaderboard")
+def get_leaderboard():
     gid = request.args.get("gid")
-    return Response(json.dumps(rooms_hist[gid]), status=200, mimetype='application/json')
+    if gid not in leaderboards:
+        return jsonify({"error": f"Unknown gid: {gid}"}), 400
+    offset = max(0, request.args.get("offset", 0, type=int))
+    limit = max(1, min(request.args.get("limit", 20, type=int), TOP_SIZE))
+    players = [{"pid": pid, "rank": offset + i + 1, "n": pid_player[pid]["n"], "a": pid_player[pid]["a"], **pid_player[pid][gid]}
+        for i, pid in enumerate(leaderboards[gid].top(limit, offset))]
+    return jsonify({"players": players, "total": len(leaderboards[gid]), "min_games": leaderboards[gid].min_games})
+
+@app.route("/leaderboard/rank")
+def get_leaderboard_rank():
+    gid, pid = request.args.get("gid"), request.args.get("pid")
+    if gid not in leaderboards:
+        return jsonify({"error": f"Unknown gid: {gid}"}), 400
+    stats = pid_player.get(pid, {}).get(gid, {})
+    return jsonify({"pid": pid, "rank": leaderboards[gid].rank(pid), "total": len(leaderboards[gid]), **stats})
 
 @app.route("/players/batch")
 def get_players_batch():  # not jsonifying here to keep original order for players
-    return Response(json.dumps(pid_player), status=200, mimetype='application/json')
+    pids = request.args.get("pids")
+    if pids is not None:  # just the players a view is showing
+        found = {pid: pid_player[pid] for pid in pids.split(",")[:PIDS_MAX] if pid in pid_player}
+        response = Response(json.dumps(found), status=200, mimetype='application/json')
+        response.add_etag()
+        return response.make_conditional(request)
+
+    offset = max(0, request.args.get("offset", 0, type=int))
+    limit = max(1, min(request.args.get("limit", PLAYERS_PAGE_SIZE, type=int), PLAYERS_PAGE_SIZE))
+    asset = players_pages.get((offset, limit))
+    if not asset:
+        if len(players_pages) >= 64:
+            players_pages.clear()
+        page = dict(itertools.islice(pid_player.items(), offset, offset + limit))
+        next_offset = offset + limit if offset + limit < len(pid_player) else None
+        asset = players_pages[(offset, limit)] = Asset(json.dumps({"players": page, "next": next_offset}).encode(), "application/json")
+    return send_asset(asset, "no-cache")
 
  ######   #######   ######  ##    ## ######## ######## ####  ####### 
 ##    ## ##     ## ##    ## ##   ##  ##          ##     ##  ##     ##
@@ -291,59 +609,66 @@ def handle_connect():
     log.info(f"User connected: {request.sid}")
 
 @socketio.on("set_pid")
-def handle_set_pid(data):
+def handle_set_pid(data):  # binds the sid in the socket's greenthread, so the pid is known before any later event of this socket runs
     pid = data.get("pid")
     sid = request.sid
+    broadcast(bind_sid, sid, pid, sid_codec.get(sid))
+    route(PLAYERS_ACTOR, register_player, pid, sid)
+    broadcast(resume_player, pid, sid)
+
+def register_player(pid, sid):  # run by the players actor, only players.json's writer creates players: a new pid gets a name and an avatar
     name = pid_player.get(pid, {}).get("n") or generate_random_name()
-    avatar = pid_player.get(pid, {}).get("a") or random.choice([a for a in avatars if a != "ai.svg"])
+    avatar = pid_player.get(pid, {}).get("a") or random.choice([a for a in avatar_store.names if a != "ai.svg"])
     if pid not in pid_player:
         pid_player[pid] = {"n": name, "a": avatar}
+        name_pid[name] = pid
         log.info(f"New player | pid: {pid:>10} | added to players db.")
-        update_db(PLAYERS_FILE, pid_player)
-    sid_pid[sid] = pid
-    save_json(SIDNAME_FILE, sid_pid)
+        update_db(PLAYERS_FILE, pid_player, [pid])
     socketio.emit("pid_set", {"pid": pid, "n": name, "a": avatar}, room=sid)
 
-@socketio.on("edit_name")
-def handle_edit_name(data):
-    pid, ep = sid_pid.get(sid := request.sid), "edit_name"
+@on_actor("edit_name", key=lambda data: PLAYERS_ACTOR)
+def handle_edit_name(data, sid):
+    pid, ep = sid_pid.get(sid), "edit_name"
     if not check_pid(sid, pid, ep):
         return
 
     old_name = data.get("old_name").strip()
     new_name = data.get("new_name").strip()
 
-    if len(new_name) < 3 or len(new_name) > 15 or new_name == old_name or any(v['n'] == new_name for v in pid_player.values()) or not new_name.isalnum() and '-' not in new_name:
+    if len(new_name) < 3 or len(new_name) > 15 or new_name == old_name or new_name in name_pid or not new_name.isalnum() and '-' not in new_name:
         if len(new_name) < 3 or len(new_name) > 15:
             msg = "name must be between 3 and 15 characters"
         elif new_name == old_name:
             msg = "name is the same as before"
-        elif any(v['n'] == new_name for v in pid_player.values()):
+        elif new_name in name_pid:
             msg = "name is already taken"
         elif not new_name.isalnum() and '-' not in new_name:
             msg = "name must be alphanumeric with hyphens"
         log.warning(f"Player | pid: {pid:>10} | tried to update his name to {new_name}, but {msg}.")
         return
 
+    if name_pid.get(pid_player[pid]["n"]) == pid:
+        del name_pid[pid_player[pid]["n"]]
+    name_pid[new_name] = pid
     pid_player[pid]["n"] = new_name
-    update_db(PLAYERS_FILE, pid_player)
+    update_db(PLAYERS_FILE, pid_player, [pid])
     log.info(f"Player | pid: {pid:>10} | updated name to {new_name} in players db.")
 
-@socketio.on("set_avatar")
-def handle_set_avatar(data):
-    pid, ep = sid_pid.get(sid := request.sid), "set_avatar"
+@on_actor("set_avatar", key=lambda data: PLAYERS_ACTOR)
+def handle_set_avatar(data, sid):
+    pid, ep = sid_pid.get(sid), "set_avatar"
     if not check_pid(sid, pid, ep):
         return
 
     avatar = data.get("avatar")
 
-    if avatar not in avatars:
+    if avatar not in avatar_store.names:
         socketio.emit("warning", {"message": "Invalid avatar"}, room=sid)
         log.warning(f"Player | pid: {pid:>10} | attempted to set invalid avatar {avatar}.")
         return
 
     pid_player[pid]["a"] = avatar
-    update_db(PLAYERS_FILE, pid_player)
+    update_db(PLAYERS_FILE, pid_player, [pid])
     log.info(f"Player | pid: {pid:>10} | changed avatar to {avatar}.")
     socketio.emit("avatar_set", avatar, room=sid)
 
@@ -352,171 +677,202 @@ def handle_check_link(data):
     gid = data.get("gid")
     rid = data.get("rid")
     sid = request.sid
-    if gid in rooms and rid in rooms[gid]:
-        socketio.emit("link_checked", {"rooms": rooms[gid], "isLinkValid": True}, room=sid)
+    if gid in rooms and (room := state.hget(f"rooms:{gid}", rid)):
+        socketio.emit("link_checked", {"rooms": {rid: room}, "isLinkValid": True}, room=sid)
     log.info(f"Player | sid: {sid} | checked link for room | rid: {rid}.")
 
+@socketio.on("set_codec")
+def handle_set_codec(data):  # sent before subscribing: channels joined earlier keep their codec
+    sid, codec = request.sid, data.get("codec")
+    broadcast(bind_sid, sid, sid_pid.get(sid), codec if codec == wire.CODEC else None)
+    log.info(f"Player | sid: {sid} | uses {codec if codec == wire.CODEC else 'json'} payloads.")
+
+@socketio.on("subscribe")
+def handle_subscribe(data):
+    if channel_data(data.get("channel") or ""):
+        join_channel(data["channel"], request.sid)
+    handle_resync(data)
+
+@socketio.on("unsubscribe")
+def handle_unsubscribe(data):
+    leave_channel(data.get("channel") or "", request.sid)
+
+@socketio.on("resync")
+def handle_resync(data):
+    channel, sid = data.get("channel") or "", request.sid
+    found = channel_data(channel)
+    if not found:
+        log.warning(f"Player | sid: {sid} | asked for unknown channel {channel}.")
+        return
+    key, gid, dataset, replace = found
+    emit_sid("db_full", {"channel": channel, "key": key, "gid": gid, "v": state.get(channel), "data": dataset, "replace": replace}, sid)
+
 @socketio.on("create_room")
-def handle_create_room(data):
-    gid, pid, ep = data.get("gid"), sid_pid.get(sid := request.sid), "create_room"
+def handle_create_room(data):  # the new room's actor creates it
+    rid = "".join(random.choices(string.ascii_letters + string.digits, k=15))
+    route(rid, create_room, data, request.sid, rid)
+
+def create_room(data, sid, rid):
+    gid, pid, ep = data.get("gid"), sid_pid.get(sid), "create_room"
     if not check_pid(sid, pid, ep):
         return
 
     mode = data.get("mode")
-    clean_rooms_from_player(pid)
-    rid = "".join(random.choices(string.ascii_letters + string.digits, k=15))
+    clean_rooms_from_player(pid, sid=sid)
     if mode == "pve":
         lvl = data.get("lvl")
         add_room(gid, rid, pid, "running")
         add_player(gid, rid, pid, False, "ready")
         add_player(gid, rid, f"AI{lvl}", True, "ready")
-        join_room(rid)
-        socketio.emit("game_start", rid, room=rid)
+        join_channel(rid, sid)
+        emit_room("game_start", rid, rid)
     elif mode == "pvp":
         add_room(gid, rid, pid, "waiting")
         add_player(gid, rid, pid, False, "waiting")
-        join_room(rid)
-        socketio.emit("room_created", rid, room=rid)
-    update_db(ROOMS_FILE[gid], rooms[gid])
+        join_channel(rid, sid)
+        emit_room("room_created", rid, rid)
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
-@socketio.on("join_room")
-def handle_join_room(data):
-    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid := request.sid), "join_room"
+@on_actor("join_room")
+def handle_join_room(data, sid):
+    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid), "join_room"
     if not check_pid(sid, pid, ep) or not check_rid(gid, rid, pid, sid, ep):
         return
 
-    clean_rooms_from_player(pid)
+    clean_rooms_from_player(pid, keep=(gid, rid), sid=sid)
 
     room = rooms[gid][rid]
-    if room["status"] != "waiting":
+    if room.status != "waiting":
         socketio.emit("warning", {"message": f"Room {rid} is not available"}, room=sid)
         log.warning(f"Player | pid: {pid:>10} | attempted to join room | rid: {rid} | but it is not available.")
         return
     
-    if room["rsize"] <= len(room["players"]):
+    if room.rsize <= len(room.players):
         socketio.emit("warning", {"message": f"Room {rid} is full"}, room=sid)
         log.warning(f"Player | pid: {pid:>10} | attempted to join room | rid: {rid} | but it is full.")
         return
 
     add_player(gid, rid, pid, False, "waiting")
-    room["status"] = "waiting"
-    join_room(rid)
-    socketio.emit("room_joined", rid, room=rid)
-    update_db(ROOMS_FILE[gid], rooms[gid])
-
-@socketio.on("update_room")
-def handle_update_room(data):
-    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid := request.sid), "update_room"
+    set_room_status(gid, rid, "waiting")
+    join_channel(rid, sid)
+    emit_room("room_joined", rid, rid)
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
+
+@on_actor("update_room")
+def handle_update_room(data, sid):
+    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid), "update_room"
     if not check_pid(sid, pid, ep) or not check_rid(gid, rid, pid, sid, ep) or not check_pid_in_room(gid, rid, pid, sid, ep):
         return
 
     update = data.get(update_label := "wins2win" if "wins2win" in data else "rsize")
 
-    if update_label == "wins2win" and not 1 <= rooms[gid][rid]["wins2win"] + update <= 5:
+    if update_label == "wins2win" and not 1 <= rooms[gid][rid].wins2win + update <= 5:
         socketio.emit("warning", {"message": "Invalid wins to win"}, room=sid)
         log.warning(f"Player | pid: {pid:>10} | attempted to set invalid wins to win in room | rid: {rid}.")
         return
     
-    if update_label == "rsize" and not 2 <= rooms[gid][rid]["rsize"] + update <= 5:
+    if update_label == "rsize" and not 2 <= rooms[gid][rid].rsize + update <= 5:
         socketio.emit("warning", {"message": "Invalid room size"}, room=sid)
         log.warning(f"Player | pid: {pid:>10} | attempted to set invalid room size in room | rid: {rid}.")
         return
 
-    rooms[gid][rid][update_label] += update
-    log.info(f"Player | pid: {pid:>10} | updated {update_label} to {rooms[gid][rid][update_label]} in room | rid: {rid}.")
-    update_db(ROOMS_FILE[gid], rooms[gid])
+    setattr(rooms[gid][rid], update_label, getattr(rooms[gid][rid], update_label) + update)
+    log.info(f"Player | pid: {pid:>10} | updated {update_label} to {getattr(rooms[gid][rid], update_label)} in room | rid: {rid}.")
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
-@socketio.on("manage_ais")
-def handle_manage_ais(data):
-    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid := request.sid), "manage_ais"
+@on_actor("manage_ais")
+def handle_manage_ais(data, sid):
+    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid), "manage_ais"
     if not check_pid(sid, pid, ep) or not check_rid(gid, rid, pid, sid, ep) or not check_pid_in_room(gid, rid, pid, sid, ep):
         return
 
     ai_dif = data.get("ai_dif")
-    players = rooms[gid][rid]["players"]
-    ais = [k for k, v in players.items() if v["is_ai"]]
+    players = rooms[gid][rid].players
+    ais = [k for k, v in players.items() if v.is_ai]
     if ai_dif == 1 and len(players) < 5:
         aiid = f"AI{len(ais) + 1}"
         add_player(gid, rid, aiid, True, "ready")
-        update_db(ROOMS_FILE[gid], rooms[gid])
+        update_db(ROOMS_FILE[gid], rooms[gid], [rid])
     elif ai_dif == -1 and len(ais):
         aiid = ais[-1]
-        del players[ais[-1]]
+        remove_player(gid, rid, aiid)
         log.info(f"{aiid} removed from room {rid}.")
-        update_db(ROOMS_FILE[gid], rooms[gid])
+        update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
-@socketio.on("player_ready")
-def handle_player_ready(data):
-    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid := request.sid), "player_ready"
+@on_actor("player_ready")
+def handle_player_ready(data, sid):
+    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid), "player_ready"
     if not check_pid(sid, pid, ep) or not check_rid(gid, rid, pid, sid, ep) or not check_pid_in_room(gid, rid, pid, sid, ep):
         return
 
     status = data.get("status")
-    rooms[gid][rid]["players"][pid]["status"] = status
+    rooms[gid][rid].players[pid].status = status
     log.info(f"Player | pid: {pid:>10} | in room | rid: {rid} | is {status}.")
 
-    all_ready = all(p["status"] == "ready" for p in rooms[gid][rid]["players"].values())
-    if all_ready and len(rooms[gid][rid]["players"]) == rooms[gid][rid]["rsize"]:
-        rooms[gid][rid]["status"] = "running"
-        socketio.emit("game_start", rid, room=rid)
+    all_ready = all(p.status == "ready" for p in rooms[gid][rid].players.values())
+    if all_ready and len(rooms[gid][rid].players) == rooms[gid][rid].rsize:
+        set_room_status(gid, rid, "running")
+        emit_room("game_start", rid, rid)
         log.info(f"Game started in room {rid}.")
-    update_db(ROOMS_FILE[gid], rooms[gid])
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
-@socketio.on("update_spec")
-def handle_update_spec(data):
-    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid := request.sid), "update_spec"
+@on_actor("update_spec")
+def handle_update_spec(data, sid):
+    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid), "update_spec"
     if not check_pid(sid, pid, ep):
         return
 
     new_spec = data.get("new_spec")
     if new_spec:
-        rooms[gid][rid]["spec"].append(pid)
-        if rooms[gid][rid]["max_spec"] < len(rooms[gid][rid]["spec"]):
-            rooms[gid][rid]["max_spec"] = len(rooms[gid][rid]["spec"])
+        rooms[gid][rid].spec.append(pid)
+        if rooms[gid][rid].max_spec < len(rooms[gid][rid].spec):
+            rooms[gid][rid].max_spec = len(rooms[gid][rid].spec)
     else:
-        spec = rooms.get(gid, {}).get(rid, {}).get("spec", set())
+        spec = rooms[gid][rid].spec if rid in rooms.get(gid, {}) else []
         if pid in spec:
             spec.remove(pid)
     log.info(f"Player | pid: {pid:>10} | in room | rid: {rid} | {'join' if new_spec else 'quit'} spec.")
-    update_db(ROOMS_FILE[gid], rooms[gid])
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
-@socketio.on("quit_game")
-def handle_quit_game(data):
-    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid := request.sid), "quit_game"
+@on_actor("quit_game")
+def handle_quit_game(data, sid):
+    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid), "quit_game"
     if not check_pid(sid, pid, ep) or not check_rid(gid, rid, pid, sid, ep) or not check_pid_in_room(gid, rid, pid, sid, ep):
         return
 
-    socketio.emit("player_left", {"pid": pid, "rid": rid}, room=rid)
-    clean_room_from_player(gid, rid, pid)
-    update_db(ROOMS_FILE[gid], rooms[gid])
+    emit_room("player_left", {"pid": pid, "rid": rid}, rid)
+    clean_room_from_player(gid, rid, pid, sid)
 
 @socketio.on("disconnect")
 def handle_disconnect():
-    pid = sid_pid.pop(sid := request.sid, None)
-    save_json(SIDNAME_FILE, sid_pid)
+    pid = sid_pid.get(sid := request.sid)
+    broadcast(bind_sid, sid, None, None)
 
     if not pid:
         log.warning(f"Player | sid: {sid} | pid: {pid:>10} | disconnected but was not found in sid_pid.")
         return
 
     log.info(f"Client disconnected | sid: {sid} | pid: {pid:>10}")
-    clean_rooms_from_player(pid)
-    for gid in rooms:
-        update_db(ROOMS_FILE[gid], rooms[gid])
+    broadcast(suspend_player, pid)
 
-@socketio.on("make_move")
-def handle_make_move(data):
-    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid := request.sid), "make_move"
+@on_actor("make_move")
+def handle_make_move(data, sid):
+    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid), "make_move"
     if not check_pid(sid, pid, ep) or not check_rid(gid, rid, pid, sid, ep) or not check_pid_in_room(gid, rid, pid, sid, ep):
         return
     
     move = data.get("move")
     room = rooms[gid][rid]
-    if room["status"] != "running":
+    if room.status != "running":
         socketio.emit("warning", {"message": "Game is not running"}, room=sid)
         log.warning(f"Player | pid: {pid:>10} | tried to make a move in room | rid: {rid} | but game {gid} is not running.")
         return
 
+    if rid in room_timers:
+        socketio.emit("warning", {"message": "Next round is starting"}, room=sid)
+        log.warning(f"Player | pid: {pid:>10} | tried to make a move in room | rid: {rid} | between rounds.")
+        return
+
     if gid == "rps":
         handle_rps_move(gid, rid, pid, room, move)
     elif gid == "c4":
@@ -531,237 +887,51 @@ def handle_make_move(data):
 ##     ## ##         ###### 
 
 def handle_rps_move(gid, rid, pid, room, move):
-    room["players"][pid]["cmove"] = move
+    if move not in rps.MOVES:  # steps keep one letter per move
+        log.warning(f"Player | pid: {pid:>10} | in room | rid: {rid} | made invalid move: {move}")
+        return
+    room.players[pid].cmove = move
     log.info(f"Player | pid: {pid:>10} | in room | rid: {rid} made move: {move}")
-    for aiid in {k for k, v in room["players"].items() if v["is_ai"]}:
-        ai_move = random.choice(["R", "P", "S"])
-        room["players"][aiid]["cmove"] = ai_move
+    for aiid in {k for k, v in room.players.items() if v.is_ai}:
+        ai_move = rps.get_ai_move()
+        room.players[aiid].cmove = ai_move
         log.info(f"{aiid} made move: {ai_move}")
 
-    player_move = {k: v["cmove"] for k, v in room["players"].items() if v["on"]}
+    player_move = {k: v.cmove for k, v in room.players.items() if v.on}
     if all(player_move.values()):
-        cplayers = get_result(player_move)
-        step = [v["cmove"] if v["on"] else "" for v in room["players"].values()]
-        room["rounds"][-1]["steps"].append(step)
+        cplayers = rps.get_result(player_move)
+        room.rounds[-1].steps.append("".join(v.cmove if v.on else OUT for v in room.players.values()))
 
-        for k, v in room["players"].items():
-            v["on"] = k in cplayers
-            v["cmove"] = None
+        for k, v in room.players.items():
+            v.on = k in cplayers
+            v.cmove = None
 
         # new step
         if 1 < len(cplayers):
-            if not all(v["is_ai"] for k, v in room["players"].items() if k in cplayers):
+            if not all(v.is_ai for k, v in room.players.items() if k in cplayers):
                 emit_data = {"rid": rid, "game_over": False, "winner": None}
-                socketio.emit("game_result_rps", emit_data, room=rid)
+                emit_room("game_result_rps", emit_data, rid)
                 log.info(f"New step in room {rid}. Remaining players: {cplayers}")
-                update_db(ROOMS_FILE[gid], rooms[gid])
+                update_db(ROOMS_FILE[gid], rooms[gid], [rid])
                 return
             else:
                 while 1 < len(cplayers):
-                    for k, v in room["players"].items():
-                        if v["is_ai"]:
-                            ai_move = random.choice(["R", "P", "S"])
-                            room["players"][k]["cmove"] = ai_move
+                    for k, v in room.players.items():
+                        if v.is_ai:
+                            ai_move = rps.get_ai_move()
+                            room.players[k].cmove = ai_move
                             log.info(f"{k} made move: {ai_move}")
-                    cplayers = get_result({k: v["cmove"] for k, v in room["players"].items() if v["on"]})
-                    step = [v["cmove"] if v["on"] else "" for v in room["players"].values()]
-                    room["rounds"][-1]["steps"].append(step)
+                    cplayers = rps.get_result({k: v.cmove for k, v in room.players.items() if v.on})
+                    room.rounds[-1].steps.append("".join(v.cmove if v.on else OUT for v in room.players.values()))
 
-                    for k, v in room["players"].items():
-                        v["on"] = k in cplayers
-                        v["cmove"] = None
+                    for k, v in room.players.items():
+                        v.on = k in cplayers
+                        v.cmove = None
 
         rwinner = cplayers[0]
         check_round_and_game_over(gid, rid, room, rwinner)
 
-    update_db(ROOMS_FILE[gid], rooms[gid])
-
-   ###    ####     ######  ##       
-  ## ##    ##     ##    ## ##    ## 
- ##   ##   ##     ##       ##    ## 
-##     ##  ##     ##       ##    ## 
-#########  ##     ##       #########
-##     ##  ##     ##    ##       ## 
-##     ## ####     ######        ## 
-
-def check_win(grid, turn):
-    p = turn
-    g = grid
-    r0, r1, r2, r3, r4, r5 = g[0], g[1], g[2], g[3], g[4], g[5]
-    for r in [r0, r1, r2, r3, r4, r5]:  # ─
-        if (r[0] == p and r[1] == p and r[2] == p and r[3] == p):
-            return True
-        if (r[1] == p and r[2] == p and r[3] == p and r[4] == p):
-            return True
-        if (r[2] == p and r[3] == p and r[4] == p and r[5] == p):
-            return True
-        if (r[3] == p and r[4] == p and r[5] == p and r[6] == p):
-            return True
-    for c in range(7):  # |
-        if (r0[c] == p and r1[c] == p and r2[c] == p and r3[c] == p):
-            return True
-        if (r1[c] == p and r2[c] == p and r3[c] == p and r4[c] == p):
-            return True
-        if (r2[c] == p and r3[c] == p and r4[c] == p and r5[c] == p):
-            return True
-    for c in range(4):  # /
-        if (r3[c] == p and r2[c+1] == p and r1[c+2] == p and r0[c+3] == p):
-            return True
-        if (r4[c] == p and r3[c+1] == p and r2[c+2] == p and r1[c+3] == p):
-            return True
-        if (r5[c] == p and r4[c+1] == p and r3[c+2] == p and r2[c+3] == p):
-            return True
-    for c in range(4):  # \
-        if (r0[c] == p and r1[c+1] == p and r2[c+2] == p and r3[c+3] == p):
-            return True
-        if (r1[c] == p and r2[c+1] == p and r3[c+2] == p and r4[c+3] == p):
-            return True
-        if (r2[c] == p and r3[c+1] == p and r4[c+2] == p and r5[c+3] == p):
-            return True
-
-def is_draw(grid):
-    return all(cell != 0 for row in grid for cell in row)
-
-def evaluate_window(window, piece):
-    score = 0
-    opp_piece = 1 if piece == 2 else 2
-    if window.count(piece) == 4:
-        score += 100
-    elif window.count(piece) == 3 and window.count(0) == 1:
-        score += 5
-    elif window.count(piece) == 2 and window.count(0) == 2:
-        score += 2
-    if window.count(opp_piece) == 3 and window.count(0) == 1:
-        score -= 4
-    return score
-
-def score_position(grid, piece):
-    score = 0
-    center_array = [row[7//2] for row in grid]
-    center_count = center_array.count(piece)
-    score += center_count * 3 # center column
-    for r in range(6):
-        row_array = grid[r]
-        for c in range(7 - 3):
-            window = row_array[c:c+4]
-            score += evaluate_window(window, piece)  # ─
-    for c in range(7):
-        col_array = [grid[r][c] for r in range(6)]
-        for r in range(6 - 3):
-            window = col_array[r:r+4]
-            score += evaluate_window(window, piece)  # |
-    for r in range(6 - 3):
-        for c in range(7 - 3):
-            window = [grid[r+i][c+i] for i in range(4)]
-            score += evaluate_window(window, piece)  # /
-    for r in range(3, 6):
-        for c in range(7 - 3):
-            window = [grid[r-i][c+i] for i in range(4)]
-            score += evaluate_window(window, piece)  # \
-    return score
-
-def is_terminal_node(grid):
-    return check_win(grid, 1) or check_win(grid, 2) or is_draw(grid)
-
-def get_valid_locations(grid):
-    return [c for c in range(7) if grid[0][c] == 0]
-
-def get_valid_locations_ordered(grid):
-    center = 7 // 2
-    valid_locations = get_valid_locations(grid)
-    ordered = sorted(valid_locations, key=lambda x: abs(x - center))
-    return ordered
-
-def add_move_in_place(grid, col, piece):
-    for row in reversed(grid):
-        if row[col] == 0:
-            row[col] = piece
-            return True
-    return False
-
-def remove_move_in_place(grid, col):
-    for row in grid:
-        if row[col] != 0:
-            row[col] = 0
-            return True
-    return False
-
-def minimax(transposition_table, grid, depth, alpha, beta, maximizingPlayer, ai_turn, player_piece):
-    grid_key = str(grid)
-    if grid_key in transposition_table:
-        return transposition_table[grid_key]
-
-    valid_locations = get_valid_locations_ordered(grid)
-    is_terminal = is_terminal_node(grid)
-    if depth == 0 or is_terminal:
-        if is_terminal:
-            if check_win(grid, ai_turn):
-                return (None, 100000000000000)
-            elif check_win(grid, player_piece):
-                return (None, -10000000000000)
-            else:  # Game is over, no more valid moves
-                return (None, 0)
-        else:  # Depth is zero
-            return (None, score_position(grid, ai_turn))
-
-    if maximizingPlayer:
-        value = -math.inf
-        best_column = random.choice(valid_locations)
-        for col in valid_locations:
-            if add_move_in_place(grid, col, ai_turn):
-                new_score = minimax(transposition_table, grid, depth-1, alpha, beta, False, ai_turn, player_piece)[1]
-                remove_move_in_place(grid, col)
-                if new_score > value:
-                    value = new_score
-                    best_column = col
-                alpha = max(alpha, value)
-                if alpha >= beta:
-                    break
-        transposition_table[grid_key] = (best_column, value)
-        return best_column, value
-
-    else:  # Minimizing player
-        value = math.inf
-        best_column = random.choice(valid_locations)
-        for col in valid_locations:
-            if add_move_in_place(grid, col, player_piece):
-                new_score = minimax(transposition_table, grid, depth-1, alpha, beta, True, ai_turn, player_piece)[1]
-                remove_move_in_place(grid, col)
-                if new_score < value:
-                    value = new_score
-                    best_column = col
-                beta = min(beta, value)
-                if alpha >= beta:
-                    break
-        transposition_table[grid_key] = (best_column, value)
-        return best_column, value
-
-def get_ai_move(grid, ai_turn, depth):
-    t = time.time()
-    opponent_piece = 1 if ai_turn == 2 else 2
-
-    # 1. Check for AI's immediate winning move
-    for col in get_valid_locations(grid):
-        if add_move_in_place(grid, col, ai_turn):
-            if check_win(grid, ai_turn):
-                remove_move_in_place(grid, col)
-                return col, round(time.time() - t, 3)  # Immediate win found
-            remove_move_in_place(grid, col)
-
-    # 2. Check for opponent's immediate winning move and block it
-    for col in get_valid_locations(grid):
-        if add_move_in_place(grid, col, opponent_piece):
-            if check_win(grid, opponent_piece):
-                remove_move_in_place(grid, col)
-                return col, round(time.time() - t, 3)  # Block opponent's win
-            remove_move_in_place(grid, col)
-
-    # 3. Use minimax if no immediate win or block is found
-    column, minimax_score = minimax({}, grid, depth, -math.inf, math.inf, True, ai_turn, opponent_piece)
-    if column is None:
-        column = random.choice(get_valid_locations(grid))
-
-    return column, round(time.time() - t, 3)
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
  ######  ##       
 ##    ## ##    ## 
@@ -771,9 +941,9 @@ def get_ai_move(grid, ai_turn, depth):
 ##    ##       ## 
  ######        ## 
 
-@socketio.on("get_help_move")
-def handle_get_help_move(data):
-    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid := request.sid), "help_move"
+@on_actor("get_help_move")
+def handle_get_help_move(data, sid):
+    gid, rid, pid, ep = data.get("gid"), data.get("rid"), sid_pid.get(sid), "help_move"
     if not check_pid(sid, pid, ep) or not check_rid(gid, rid, pid, sid, ep) or not check_pid_in_room(gid, rid, pid, sid, ep):
         return
 
@@ -782,57 +952,121 @@ def handle_get_help_move(data):
         log.warning(f"Player | pid: {pid:>10} | tried to get help move in room | rid: {rid} | but it is not available for game {gid}.")
         return
 
+    if rid in room_timers:
+        log.info(f"Player | pid: {pid:>10} | asked for help in room | rid: {rid} | between rounds.")
+        return
+
     room = rooms[gid][rid]
-    turn = 1 if pid == list(room["players"])[0] else 2
-    grid = room["grid"]
-    help_move, time_taken = get_ai_move(grid, turn, 6)
-    socketio.emit("help_move", help_move, room=sid)
-    log.info(f"Player | pid: {pid:>10} | rid: {rid} | got help: {help_move} in {time_taken}s.")
-
-def add_move(room, rid, pid, grid, move, turn, time_taken=None):
-    if len(room["rounds"][-1]["moves"]) % 2 == turn - 1:
-        for row in reversed(grid):
-            if row[move] == 0:
-                row[move] = turn
-                room["rounds"][-1]["moves"].append(move)
-                text = f"Player | pid: {pid:>10} | rid: {rid} | turn: {turn} | made move: {move}"
-                if time_taken:
-                    text += f" in {time_taken}s"
-                log.info(text)
-                return True
+    turn = 1 if pid == list(room.players)[0] else 2
+    moves = list(room.rounds[-1].moves)
+    board = c4.Board.from_moves(moves)
+    valid_locations = board.valid_moves()
+    if not valid_locations:
+        return
+
+    if (forced := c4.forced_move(board, turn)) is not None:
+        socketio.emit("help_move", {"col": forced, "scores": [None] * c4.COLS, "exact": [False] * c4.COLS, "depth": 0}, room=sid)
+        log.info(f"Player | pid: {pid:>10} | rid: {rid} | got help: {forced} (forced).")
+        return
+
+    # one search per root move spread over the pool, jobs picked up late search against the best score so far
+    budget_ms = c4.HELP_BUDGET_MS * min(1, search_pool.background_width / len(valid_locations))
+    t = time.time()
+    help = {"scores": [None] * c4.COLS, "exact": [False] * c4.COLS, "depths": [], "alpha": None, "pending": len(valid_locations)}
+
+    def add_score(result):  # None for a failed job, which still counts as done
+        if result is not None:
+            col = result["col"]
+            help["scores"][col], help["exact"][col] = result["score"], result["exact"]
+            help["depths"].append(result["depth"])
+            if result["exact"] and (help["alpha"] is None or help["alpha"] < result["score"]):
+                help["alpha"] = result["score"]
+        help["pending"] -= 1
+        if help["pending"]:
+            return
+        scored = [c for c in valid_locations if help["scores"][c] is not None]  # partial when jobs failed
+        best = max(scored, key=lambda c: (help["exact"][c], help["scores"][c])) if scored else valid_locations[0]
+        depth = min(help["depths"], default=0)
+        socketio.emit("help_move", {"col": best, "scores": help["scores"], "exact": help["exact"], "depth": depth}, room=sid)
+        log.info(f"Player | pid: {pid:>10} | rid: {rid} | got help: {best} in {round(time.time() - t, 3)}s at depth {depth}.")
+
+    for col in valid_locations:
+        args = lambda col=col: {"moves": moves, "col": col, "turn": turn, "budget_ms": budget_ms, "alpha": help["alpha"]}
+        search_pool.submit(rid, "score_move", args, add_score, background=True)
+
+def add_move(room, rid, pid, board, move, turn, time_taken=None, depth=None):
+    if len(room.rounds[-1].moves) % 2 == turn - 1 and move in range(c4.COLS) and board.can_play(move):
+        row = board.play(move, turn)
+        room.grid[row * COLS + move] = turn
+        room.rounds[-1].moves.append(move)
+        text = f"Player | pid: {pid:>10} | rid: {rid} | turn: {turn} | made move: {move}"
+        if time_taken:
+            text += f" in {time_taken}s"
+        if depth:
+            text += f" at depth {depth}"
+        log.info(text)
+        return True
+
+def end_c4_move(gid, rid, room, board, rwinner):
+    if not rwinner and not board.is_full():
+        emit_data = {"rid": rid, "game_over": False, "winner": None}
+        emit_room("game_result_c4", emit_data, rid)
+    
+    if rwinner or board.is_full():
+        check_round_and_game_over(gid, rid, room, rwinner)
+
+    update_db(ROOMS_FILE[gid], rooms[gid], [rid])
 
 def handle_c4_move(gid, rid, pid, room, move):
-    if room["rounds"][-1]["winner"]:
-        socketio.emit("warning", {"message": "Round is over"}, room=rid)
+    if room.rounds[-1].winner:
+        emit_room("warning", {"message": "Round is over"}, rid)
         log.warning(f"Player | pid: {pid:>10} | made a move in room | rid: {rid} | but round is over.")
         return
     rwinner = None
-    p1, p2 = list(room["players"])
+    p1, p2 = list(room.players)
     turn = 1 if pid == p1 else 2
-    grid = room["grid"]
+    moves = room.rounds[-1].moves
+    board = c4.Board.from_moves(moves)
 
-    if add_move(room, rid, pid, grid, move, turn) and check_win(grid, turn):
+    moved = add_move(room, rid, pid, board, move, turn)
+    if moved and board.won(turn):
         rwinner = pid
 
-    ai_name = next((k for k in room["players"] if k.startswith("AI")), None)
-    if not rwinner and not is_draw(grid) and ai_name:
-
+    ai_name = next((k for k in room.players if k.startswith("AI")), None)
+    if moved and not rwinner and not board.is_full() and ai_name:
         ai_turn = 1 if ai_name == p1 else 2
         ai_lvl = int(ai_name[2:])
-        lvl_depth = min({1: 3, 2: 4, 3: 5}[ai_lvl], 5)
-        ai_move, time_taken = get_ai_move(grid, ai_turn, lvl_depth)
+        n_moves = len(moves)
+
+        def play_ai_move(result):
+            if rooms[gid].get(rid) is not room or room.rounds[-1].moves is not moves or len(moves) != n_moves:
+                log.info(f"{ai_name} move dropped, room | rid: {rid} | changed during search.")
+                return
+            if result is None:  # the pool failed, a short search here keeps the game going
+                col, time_taken, depth = c4.get_ai_move(board.copy(), ai_turn, c4.FALLBACK_BUDGET_MS)
+                result = {"col": col, "time_taken": time_taken, "depth": depth}
+                log.warning(f"{ai_name} | rid: {rid} | played a fallback move after a failed search.")
+            rwinner = None
+            if add_move(room, rid, ai_name, board, result["col"], ai_turn, result["time_taken"], result["depth"]) and board.won(ai_turn):
+                rwinner = ai_name
+            end_c4_move(gid, rid, room, board, rwinner)
+
+        end_c4_move(gid, rid, room, board, rwinner)  # show the player's move while the AI thinks
+        search_pool.submit(rid, "get_ai_move", {"moves": list(moves), "turn": ai_turn, "budget_ms": c4.AI_BUDGET_MS[ai_lvl]},
+            lambda result: actors.send(rid, play_ai_move, result))
+        return
 
-        if add_move(room, rid, ai_name, grid, ai_move, ai_turn, time_taken) and check_win(grid, ai_turn):
-            rwinner = ai_name
+    end_c4_move(gid, rid, room, board, rwinner)
 
-    if not rwinner and not is_draw(grid):
-        emit_data = {"rid": rid, "game_over": False, "winner": None}
-        socketio.emit("game_result_c4", emit_data, room=rid)
-    
-    if rwinner or is_draw(grid):
-        check_round_and_game_over(gid, rid, room, rwinner)
+FORWARDED = {fn.__name__: fn for fn in [bind_sid, register_player, leave_rooms, suspend_player, resume_player, sync_players, save_game, create_room,
+    handle_edit_name, handle_set_avatar, handle_join_room, handle_update_room, handle_manage_ais, handle_player_ready,
+    handle_update_spec, handle_quit_game, handle_make_move, handle_get_help_move]}  # what other workers may run here
 
-    update_db(ROOMS_FILE[gid], rooms[gid])
+if OWNS_PLAYERS:
+    actors.send(PLAYERS_ACTOR, migrate_history)
+    actors.send(PLAYERS_ACTOR, archive_history)
+boot_times["total"] = round(time.monotonic() - boot_start, 3)
+log.info(f"Boot | worker {WORKER_INDEX} ready in {boot_times['total']}s.")
 
 if __name__ == "__main__":
     socketio.run(app, host="0.0.0.0", port=5001, debug=app.config["DEBUG"])
\ No newline at end of file
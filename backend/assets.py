@@ -0,0 +1,12 @@
+# backend/assets.py
+
+import gzip, hashlib
+
+class Asset:
+    """A prebuilt response body, kept plain and gzipped, with a content-hash ETag."""
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.gzip = gzip.compress(body, 9)
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:16]
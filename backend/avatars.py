@@ -0,0 +1,57 @@
+# backend/avatars.py
+
+import os, json, time, logging
+from assets import Asset
+
+log = logging.getLogger(__name__)
+
+CHECK_INTERVAL = float(os.environ.get("AVATAR_CHECK_INTERVAL", 5.0))  # seconds between directory checks
+
+class AvatarStore:
+    """The SVGs of a directory, loaded once and reloaded only when a file is added, removed or modified.
+
+    Each avatar is served from /avatars/<hash>/<name>, a URL that changes with its content and can
+    be cached forever. The bundle maps avatar names to those URLs.
+    """
+
+    def __init__(self, path, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.checked = 0.0
+        self.signature = None
+        self.files = {}  # name -> Asset
+        self.bundle = None
+        self.refresh(force=True)
+
+    @property
+    def names(self):
+        self.refresh()
+        return list(self.files)
+
+    def _signature(self):
+        with os.scandir(self.path) as it:
+            return sorted((e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in it if e.name.endswith(".svg"))
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.checked < self.check_interval:
+            return
+        self.checked = now
+        signature = self._signature()
+        if signature == self.signature:
+            return
+        files = {}
+        for name, _, _ in signature:
+            with open(os.path.join(self.path, name), "rb") as f:
+                files[name] = Asset(f.read(), "image/svg+xml")
+        self.files = files
+        self.bundle = Asset(json.dumps({name: self.url(name) for name in files}).encode(), "application/json")
+        self.signature = signature
+        log.info(f"{len(files)} avatars loaded from {self.path}.")
+
+    def url(self, name):
+        return f"/avatars/{self.files[name].etag}/{name}"
+
+    def get(self, name):
+        self.refresh()
+        return self.files.get(name)
@@ -0,0 +1,185 @@
+# backend/bench.py
+# Headless AI benchmark, no Flask/SocketIO: python bench.py [--games 4] [--out bench.json] [--compare old.json]
+
+import json, math, time, random, argparse, platform, subprocess
+import c4, rps
+
+PLIES = [0, 4, 8, 12, 16, 20]
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def c4_corpus(per_ply=3, seed=0):
+    """Fixed positions from seeded random games, without an immediate win or block for the side to move."""
+    rng = random.Random(seed)
+    corpus = []
+    for ply in PLIES:
+        found = 0
+        while found < per_ply:
+            board, moves = c4.Board(), []
+            while len(moves) < ply:
+                piece = 1 + board.count % 2
+                col = rng.choice([c for c in board.valid_moves() if not board.wins_at(c, piece)] or [None])
+                if col is None:
+                    break
+                board.play(col, piece)
+                moves.append(col)
+            if len(moves) == ply and not any(board.wins_at(c, p) for c in board.valid_moves() for p in (1, 2)):
+                corpus.append(moves)
+                found += 1
+    return corpus
+
+def bench_c4_search(corpus, depths):
+    rows = []
+    tt = c4.TT
+    for moves in corpus:
+        turn = 1 + len(moves) % 2
+        for depth in depths:
+            board = c4.Board.from_moves(moves)
+            tt.clear()
+            tt.new_search()
+            t = time.perf_counter()
+            c4.minimax(tt, board, depth, -math.inf, math.inf, True, turn, 3 - turn)
+            dt = time.perf_counter() - t
+            rows.append({"ply": len(moves), "depth": depth, "time": round(dt, 5), "nodes": tt.nodes,
+                "nps": round(tt.nodes / dt) if dt else None, "tt_hit_rate": round(tt.hits / tt.probes, 4) if tt.probes else None})
+        for lvl, budget_ms in c4.AI_BUDGET_MS.items():
+            tt.clear()
+            col, time_taken, depth = c4.get_ai_move(c4.Board.from_moves(moves), turn, budget_ms, book=None)
+            rows.append({"ply": len(moves), "lvl": lvl, "budget_ms": budget_ms, "time": time_taken, "depth": depth, "nodes": tt.nodes,
+                "tt_hit_rate": round(tt.hits / tt.probes, 4) if tt.probes else None})
+    return rows
+
+def summarize_c4_search(rows):
+    by_depth, by_lvl = {}, {}
+    for r in rows:
+        if "lvl" in r:
+            by_lvl.setdefault(r["lvl"], []).append(r)
+        else:
+            by_depth.setdefault(r["depth"], []).append(r)
+    return {
+        "by_depth": {d: {"mean_time": round(sum(r["time"] for r in rs) / len(rs), 5),
+            "nps": round(sum(r["nodes"] for r in rs) / sum(r["time"] for r in rs))} for d, rs in by_depth.items()},
+        "by_lvl": {lvl: {"mean_depth": round(sum(r["depth"] for r in rs) / len(rs), 2),
+            "mean_tt_hit_rate": round(sum(r["tt_hit_rate"] or 0 for r in rs) / len(rs), 4)} for lvl, rs in by_lvl.items()}}
+
+def play_c4_match(lvl_a, lvl_b, wins2win=2, budget_scale=1.0):
+    """AI vs AI under the handle_c4_move rules: the first player opens every round, draws score nobody."""
+    levels = {"a": lvl_a, "b": lvl_b}
+    wins, moves_log = {"a": 0, "b": 0}, []
+    while max(wins.values()) < wins2win:
+        board, turn_of = c4.Board(), {1: "a", 2: "b"}
+        rwinner = None
+        while not board.is_full():
+            piece = 1 + board.count % 2
+            col, time_taken, depth = c4.get_ai_move(board, piece, c4.AI_BUDGET_MS[levels[turn_of[piece]]] * budget_scale)
+            board.play(col, piece)
+            moves_log.append({"lvl": levels[turn_of[piece]], "ply": board.count - 1, "time": time_taken, "depth": depth})
+            if board.won(piece):
+                rwinner = turn_of[piece]
+                break
+        if rwinner:
+            wins[rwinner] += 1
+        elif len(moves_log) > 42 * 20:
+            break  # draw loop
+    return wins, moves_log
+
+def bench_c4_tournament(games, budget_scale):
+    results = []
+    for lvl_a in c4.AI_BUDGET_MS:
+        for lvl_b in c4.AI_BUDGET_MS:
+            if lvl_a >= lvl_b:
+                continue
+            score = {lvl_a: 0, lvl_b: 0}
+            move_times = {}
+            for g in range(games):
+                first, second = (lvl_a, lvl_b) if g % 2 == 0 else (lvl_b, lvl_a)
+                wins, moves_log = play_c4_match(first, second, budget_scale=budget_scale)
+                if wins["a"] != wins["b"]:
+                    score[first if wins["a"] > wins["b"] else second] += 1
+                for m in moves_log:
+                    move_times.setdefault(m["lvl"], []).append(m)
+            results.append({"pair": [lvl_a, lvl_b], "games": games, "wins": score,
+                "moves": {lvl: {"mean_time": round(sum(m["time"] for m in ms) / len(ms), 4),
+                    "max_time": max(m["time"] for m in ms),
+                    "mean_depth": round(sum(m["depth"] for m in ms) / len(ms), 2)} for lvl, ms in move_times.items()}})
+    return results
+
+def play_rps_match(n_ais, wins2win=2):
+    """AI-only room under the handle_rps_move rules, returns (winner, steps played)."""
+    players = {f"AI{i + 1}": {"w": 0, "on": True, "cmove": None} for i in range(n_ais)}
+    steps = 0
+    while max(v["w"] for v in players.values()) < wins2win:
+        for v in players.values():
+            v["on"] = True
+        cplayers = list(players)
+        while True:
+            for k in cplayers:
+                players[k]["cmove"] = rps.get_ai_move()
+            cplayers = rps.get_result({k: players[k]["cmove"] for k in cplayers})
+            steps += 1
+            if len(cplayers) == 1:
+                break
+        players[cplayers[0]]["w"] += 1
+    return max(players, key=lambda k: players[k]["w"]), steps
+
+def bench_rps(games):
+    results = []
+    for n_ais in range(2, 6):
+        t = time.perf_counter()
+        winners, steps = {}, 0
+        for _ in range(games):
+            winner, s = play_rps_match(n_ais)
+            winners[winner] = winners.get(winner, 0) + 1
+            steps += s
+        dt = time.perf_counter() - t
+        results.append({"players": n_ais, "games": games, "games_per_sec": round(games / dt),
+            "steps_per_sec": round(steps / dt), "mean_steps": round(steps / games, 2), "winners": winners})
+    return results
+
+def compare(old, new):
+    print(f"\nCompared with {old['meta'].get('git_rev')} ({old['meta']['date']}):")
+    for d, v in new["c4_search"]["summary"]["by_depth"].items():
+        o = old["c4_search"]["summary"]["by_depth"].get(str(d)) or old["c4_search"]["summary"]["by_depth"].get(d)
+        if o:
+            print(f"  c4 depth {d}: {o['mean_time']}s -> {v['mean_time']}s, {o['nps']} -> {v['nps']} nodes/s ({v['nps'] / o['nps'] - 1:+.0%})")
+    for lvl, v in new["c4_search"]["summary"]["by_lvl"].items():
+        o = old["c4_search"]["summary"]["by_lvl"].get(str(lvl)) or old["c4_search"]["summary"]["by_lvl"].get(lvl)
+        if o:
+            print(f"  c4 AI{lvl}: mean depth {o['mean_depth']} -> {v['mean_depth']}")
+    for o, v in zip(old["rps"], new["rps"]):
+        print(f"  rps {v['players']} players: {o['games_per_sec']} -> {v['games_per_sec']} games/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the c4 and rps AIs without starting the server.")
+    parser.add_argument("--depths", default="1,2,3,4,5,6", help="fixed minimax depths to time")
+    parser.add_argument("--per-ply", type=int, default=3, help="corpus positions per ply")
+    parser.add_argument("--games", type=int, default=4, help="c4 matches per AI pairing")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="scale AI time budgets in tournaments")
+    parser.add_argument("--rps-games", type=int, default=2000)
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--compare", help="previous output to compare with")
+    args = parser.parse_args()
+
+    random.seed(0)
+    corpus = c4_corpus(args.per_ply)
+    search_rows = bench_c4_search(corpus, [int(d) for d in args.depths.split(",")])
+    out = {
+        "meta": {"date": int(time.time()), "git_rev": git_rev(), "python": platform.python_version(), "args": vars(args)},
+        "c4_search": {"corpus": corpus, "rows": search_rows, "summary": summarize_c4_search(search_rows)},
+        "c4_tournament": bench_c4_tournament(args.games, args.budget_scale),
+        "rps": bench_rps(args.rps_games)}
+
+    with open(args.out, "w") as f:
+        json.dump(out, f, indent=4)
+    print(json.dumps({"c4_search": out["c4_search"]["summary"], "c4_tournament": out["c4_tournament"], "rps": out["rps"]}, indent=4))
+    print(f"Results written to {args.out}.")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), out)
+
+if __name__ == "__main__":
+    main()
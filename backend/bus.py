@@ -0,0 +1,205 @@
+# backend/bus.py
+# State and message bus shared by the backend workers, see cluster.py.
+# One worker keeps everything in process (MemoryState). Several workers talk to a broker on a unix socket
+# (SocketState, served by serve()), which holds the shared keys and hashes and relays published messages.
+
+import os, json, time, zlib, socket, logging
+import eventlet
+from eventlet.queue import Queue
+from eventlet.semaphore import Semaphore
+from socketio import PubSubManager
+
+log = logging.getLogger(__name__)
+
+WORKERS = int(os.environ.get("WORKERS", 1))
+WORKER_INDEX = int(os.environ.get("WORKER_INDEX", 0))
+BUS_PATH = os.environ.get("BUS_PATH", "/tmp/games-bus.sock")
+CONNECT_TIMEOUT = 10.0  # seconds a worker waits for the broker at startup
+
+def shard_of(key):
+    return zlib.crc32(key.encode()) % WORKERS
+
+def to_json(value):  # hash values are JSON or have a to_json(), like rooms
+    return value.to_json() if hasattr(value, "to_json") else value
+
+class MemoryState:
+    """Counters and hashes of a single worker, nothing to share and nothing to publish.
+
+    Hash values are kept as given, live objects included, and turned into JSON when read.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+
+    def incr(self, key):
+        v = self.values[key] = self.values.get(key, 0) + 1
+        return v
+
+    def get(self, key):
+        return self.values.get(key, 0)
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def hset(self, name, key, value):
+        self.hashes.setdefault(name, {})[key] = value
+
+    def hdel(self, name, key):
+        self.hashes.get(name, {}).pop(key, None)
+
+    def hget(self, name, key):
+        return to_json(self.hashes.get(name, {}).get(key))
+
+    def hgetall(self, name):
+        return {k: to_json(v) for k, v in self.hashes.get(name, {}).items()}
+
+class SocketState:
+    """Same interface as MemoryState, kept by the broker, plus publish() and listen() for the bus.
+
+    Requests are JSON lines on one connection. Writes are not answered, and the broker handles a
+    connection's lines in order, so a read always sees this worker's earlier writes.
+    """
+
+    def __init__(self, path=BUS_PATH):
+        self.path = path
+        self.lock = Semaphore(1)
+        self.sock = self._connect()
+        self.rfile = self.sock.makefile("rb")
+
+    def _connect(self):
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.path)
+                return sock
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                eventlet.sleep(0.1)
+
+    def _call(self, *request, reply=False):
+        line = json.dumps(request, default=to_json).encode() + b"\n"
+        with self.lock:
+            self.sock.sendall(line)
+            if reply:
+                return json.loads(self.rfile.readline())
+
+    def incr(self, key):
+        return self._call("incr", key, reply=True)
+
+    def get(self, key):
+        return self._call("get", key, reply=True)
+
+    def delete(self, key):
+        self._call("del", key)
+
+    def hset(self, name, key, value):
+        self._call("hset", name, key, value)
+
+    def hdel(self, name, key):
+        self._call("hdel", name, key)
+
+    def hget(self, name, key):
+        return self._call("hget", name, key, reply=True)
+
+    def hgetall(self, name):
+        return self._call("hgetall", name, reply=True)
+
+    def publish(self, message):
+        self._call("pub", message)
+
+    def subscribe(self):  # every message published from now on, in the order the broker got them, on a connection of its own
+        sock = self._connect()
+        sock.sendall(b'["sub"]\n')
+        return (json.loads(line) for line in sock.makefile("rb"))
+
+class BusManager(PubSubManager):
+    """Socket.IO client manager publishing emits and room changes on the bus, so each reaches the worker
+    holding the client. Messages with method "forward" are worker to worker and go to on_forward instead."""
+
+    name = "bus"
+
+    def __init__(self, state, on_forward, channel="socketio", write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.state = state
+        self.on_forward = on_forward
+        self.feed = state.subscribe()
+
+    def start(self):  # at boot rather than on the first connection, forwards come in before any client connects here
+        self.server.manager_initialized = True
+        self.initialize()
+
+    def _publish(self, data):
+        self.state.publish(data)
+
+    def _listen(self):
+        for message in self.feed:
+            if message.get("method") != "forward":
+                yield message
+            elif message["from"] != WORKER_INDEX and message["to"] in ("*", WORKER_INDEX):
+                try:
+                    self.on_forward(message)
+                except Exception:
+                    log.exception(f"Forwarded {message.get('fn')} failed.")
+
+def serve(path=BUS_PATH):
+    """The broker: counters and hashes for SocketState, and fan-out of published lines to every subscriber."""
+    values, hashes, subscribers = {}, {}, set()
+
+    def deliver(conn, queue):  # one writer per subscriber keeps its lines in order without blocking the others
+        while (line := queue.get()) is not None:
+            try:
+                conn.sendall(line)
+            except OSError:
+                break
+        conn.close()
+
+    def session(conn):
+        queue = None
+        try:
+            for line in conn.makefile("rb"):
+                op, *args = json.loads(line)
+                if op == "pub":
+                    out = json.dumps(args[0]).encode() + b"\n"
+                    for q in subscribers:
+                        q.put(out)
+                    continue
+                if op == "incr":
+                    reply = values[args[0]] = values.get(args[0], 0) + 1
+                elif op == "get":
+                    reply = values.get(args[0], 0)
+                elif op == "del":
+                    values.pop(args[0], None)
+                elif op == "hset":
+                    hashes.setdefault(args[0], {})[args[1]] = args[2]
+                elif op == "hdel":
+                    hashes.get(args[0], {}).pop(args[1], None)
+                elif op == "hget":
+                    reply = hashes.get(args[0], {}).get(args[1])
+                elif op == "hgetall":
+                    reply = hashes.get(args[0], {})
+                elif op == "sub":
+                    queue = Queue()
+                    subscribers.add(queue)
+                    eventlet.spawn(deliver, conn, queue)
+                if op in ("incr", "get", "hget", "hgetall"):
+                    conn.sendall(json.dumps(reply).encode() + b"\n")
+        except (OSError, ValueError) as e:
+            log.warning(f"Bus connection dropped: {e}")
+        finally:
+            if queue is not None:
+                subscribers.discard(queue)
+                queue.put(None)
+            else:
+                conn.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = eventlet.listen(path, family=socket.AF_UNIX)
+    os.chmod(path, 0o600)
+    log.info(f"Bus listening on {path}.")
+    while True:
+        conn, _ = server.accept()
+        eventlet.spawn(session, conn)
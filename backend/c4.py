@@ -0,0 +1,442 @@
+# backend/c4.py
+
+import os, math, mmap, random, struct, time, logging
+from array import array
+
+log = logging.getLogger(__name__)
+
+# Bitboard layout: one integer per piece, 7 bits per column (6 rows + 1 sentinel bit),
+# bit index = col * 7 + row, row 0 being the bottom of the grid.
+ROWS, COLS = 6, 7
+H1 = ROWS + 1
+CENTER = COLS // 2
+ORDER = sorted(range(COLS), key=lambda c: abs(c - CENTER))
+TOP = [c * H1 + ROWS for c in range(COLS)]
+
+WIN_SCORE = 100000000000000
+LOSS_SCORE = -10000000000000
+
+# Zobrist keys per (piece, bit), fixed seed so hashes match across worker processes
+_rng = random.Random(0xC4)
+ZOBRIST = [[_rng.getrandbits(64) for _ in range(COLS * H1)] for _ in range(3)]
+SEARCH_KEYS = {(p, m): _rng.getrandbits(64) for p in (1, 2) for m in (False, True)}  # (ai_turn, maximizing)
+
+TT_SIZE_MB = int(os.environ.get("C4_TT_MB", 16))
+EXACT, LOWER, UPPER = 0, 1, 2
+
+BOOK_FILE = os.environ.get("C4_BOOK", "db/c4_book.bin")
+BOOK_MAGIC = b"C4BOOK1\0"
+BOOK_HEADER = struct.Struct("<8sII")  # magic, ply, record count
+COL_MASK = (1 << H1) - 1
+
+# search time budgets in ms, per AI level and for the HELP button
+AI_BUDGET_MS = {1: 30, 2: 150, 3: 600}
+HELP_BUDGET_MS = 1500
+FALLBACK_BUDGET_MS = 30  # in-process search when the pool fails, short since it blocks the hub
+
+class SearchTimeout(Exception):
+    pass
+
+def bit(row, col):
+    return 1 << (col * H1 + row)
+
+BOTTOM = sum(bit(0, c) for c in range(COLS))
+
+def mirror(bb):
+    return sum(((bb >> (c * H1)) & COL_MASK) << ((COLS - 1 - c) * H1) for c in range(COLS))
+
+def has_won(bb):
+    for s in (1, H1, H1 - 1, H1 + 1):  # |, ─, \, /
+        m = bb & (bb >> s)
+        if m & (m >> 2 * s):
+            return True
+    return False
+
+def evaluate_window(window, piece):
+    score = 0
+    opp_piece = 1 if piece == 2 else 2
+    if window.count(piece) == 4:
+        score += 100
+    elif window.count(piece) == 3 and window.count(0) == 1:
+        score += 5
+    elif window.count(piece) == 2 and window.count(0) == 2:
+        score += 2
+    if window.count(opp_piece) == 3 and window.count(0) == 1:
+        score -= 4
+    return score
+
+# every 4-cell line of the grid as a mask, and its score by (own, opp) piece counts
+WINDOWS = (
+    [sum(bit(r, c + i) for i in range(4)) for r in range(ROWS) for c in range(COLS - 3)] +  # ─
+    [sum(bit(r + i, c) for i in range(4)) for c in range(COLS) for r in range(ROWS - 3)] +  # |
+    [sum(bit(r + i, c + i) for i in range(4)) for r in range(ROWS - 3) for c in range(COLS - 3)] +  # /
+    [sum(bit(r + 3 - i, c + i) for i in range(4)) for r in range(ROWS - 3) for c in range(COLS - 3)])  # \
+WINDOW_SCORE = [[evaluate_window([1] * own + [2] * opp + [0] * (4 - own - opp), 1) if own + opp <= 4 else 0
+    for opp in range(5)] for own in range(5)]
+CELL_WINDOWS = [tuple(w for w, mask in enumerate(WINDOWS) if mask >> h & 1) for h in range(COLS * H1)]
+CENTER_BONUS = [3 if h // H1 == CENTER else 0 for h in range(COLS * H1)]
+
+def _window_moves(piece, step):
+    """Window state n1 * 5 + n2 -> (new state, score change for piece 1, for piece 2) when piece is added/removed."""
+    moves = []
+    for st in range(25):
+        n = [0, st // 5, st % 5]
+        old = WINDOW_SCORE[n[1]][n[2]], WINDOW_SCORE[n[2]][n[1]]
+        n[piece] += step
+        if n[1] + n[2] > 4 or n[piece] < 0:
+            moves.append(None)
+            continue
+        moves.append((n[1] * 5 + n[2], WINDOW_SCORE[n[1]][n[2]] - old[0], WINDOW_SCORE[n[2]][n[1]] - old[1]))
+    return moves
+
+WINDOW_ADD = [None, _window_moves(1, 1), _window_moves(2, 1)]
+WINDOW_REMOVE = [None, _window_moves(1, -1), _window_moves(2, -1)]
+
+def score_position(grid, piece):
+    score = 0
+    center_array = [row[7//2] for row in grid]
+    center_count = center_array.count(piece)
+    score += center_count * 3 # center column
+    for r in range(6):
+        row_array = grid[r]
+        for c in range(7 - 3):
+            window = row_array[c:c+4]
+            score += evaluate_window(window, piece)  # ─
+    for c in range(7):
+        col_array = [grid[r][c] for r in range(6)]
+        for r in range(6 - 3):
+            window = col_array[r:r+4]
+            score += evaluate_window(window, piece)  # |
+    for r in range(6 - 3):
+        for c in range(7 - 3):
+            window = [grid[r+i][c+i] for i in range(4)]
+            score += evaluate_window(window, piece)  # /
+    for r in range(3, 6):
+        for c in range(7 - 3):
+            window = [grid[r-i][c+i] for i in range(4)]
+            score += evaluate_window(window, piece)  # \
+    return score
+
+class Board:
+    __slots__ = ("bb", "heights", "count", "hash", "windows", "scores")
+
+    def __init__(self):
+        self.bb = [0, 0, 0]  # indexed by piece, 0 unused
+        self.heights = [c * H1 for c in range(COLS)]  # next free bit of each column
+        self.count = 0
+        self.hash = 0
+        self.windows = [0] * len(WINDOWS)  # pieces in each window, as n1 * 5 + n2
+        self.scores = [0, 0, 0]  # running score_position of each piece
+
+    @classmethod
+    def from_moves(cls, moves):
+        board = cls()
+        for i, col in enumerate(moves):
+            board.play(col, 1 + i % 2)
+        return board
+
+    def copy(self):
+        board = Board()
+        board.bb, board.heights, board.count, board.hash = self.bb[:], self.heights[:], self.count, self.hash
+        board.windows, board.scores = self.windows[:], self.scores[:]
+        return board
+
+    def can_play(self, col):
+        return self.heights[col] < TOP[col]
+
+    def valid_moves(self):
+        return [c for c in ORDER if self.heights[c] < TOP[c]]
+
+    def play(self, col, piece):  # returns the grid row (0 = top) the piece landed on
+        h = self.heights[col]
+        self.bb[piece] |= 1 << h
+        self.heights[col] = h + 1
+        self.count += 1
+        self.hash ^= ZOBRIST[piece][h]
+        self._update_scores(h, piece, WINDOW_ADD[piece], 1)
+        return ROWS - 1 - (h - col * H1)
+
+    def undo(self, col):
+        h = self.heights[col] - 1
+        m = 1 << h
+        self.heights[col] = h
+        self.count -= 1
+        piece = 1 if self.bb[1] & m else 2
+        self.bb[piece] ^= m
+        self.hash ^= ZOBRIST[piece][h]
+        self._update_scores(h, piece, WINDOW_REMOVE[piece], -1)
+
+    def _update_scores(self, h, piece, moves, sign):
+        windows = self.windows
+        d1 = d2 = 0
+        for w in CELL_WINDOWS[h]:
+            windows[w], a, b = moves[windows[w]]
+            d1 += a
+            d2 += b
+        scores = self.scores
+        scores[1] += d1
+        scores[2] += d2
+        scores[piece] += sign * CENTER_BONUS[h]
+
+    def won(self, piece):
+        return has_won(self.bb[piece])
+
+    def wins_at(self, col, piece):
+        return has_won(self.bb[piece] | (1 << self.heights[col]))
+
+    def is_full(self):
+        return self.count == ROWS * COLS
+
+    def score(self, piece):  # same as score_position(self.to_grid(), piece)
+        return self.scores[piece]
+
+    def book_keys(self):  # unique key of the position and of its mirror image
+        mask = self.bb[1] | self.bb[2]
+        return self.bb[1] + mask + BOTTOM, mirror(self.bb[1]) + mirror(mask) + BOTTOM
+
+    def to_grid(self):
+        return [[1 if self.bb[1] & bit(r, c) else 2 if self.bb[2] & bit(r, c) else 0 for c in range(COLS)]
+            for r in reversed(range(ROWS))]
+
+class TranspositionTable:
+    """Fixed-size table shared by every search of the process.
+
+    Slots are indexed by the low bits of the key and hold the full key, the value and a packed
+    (depth, bound, best column, generation) word. A slot is overwritten when it is empty, stale
+    (written by an older search) or holds a result searched no deeper than the new one.
+    """
+    __slots__ = ("mask", "keys", "values", "meta", "gen", "nodes", "probes", "hits")
+
+    def __init__(self, size_mb=TT_SIZE_MB):
+        slots = 1 << max(10, (size_mb * 1024 * 1024 // 20).bit_length() - 1)  # 8 + 8 + 4 bytes a slot
+        self.mask = slots - 1
+        self.keys = array("Q", bytes(8 * slots))
+        self.values = array("q", bytes(8 * slots))
+        self.meta = array("I", bytes(4 * slots))
+        self.gen = 0
+        self.nodes = self.probes = self.hits = 0  # search counters, read by bench.py
+
+    def new_search(self):
+        self.gen = (self.gen + 1) & 0xFF
+
+    def probe(self, key):  # (depth, bound, column, value) or None
+        self.probes += 1
+        i = key & self.mask
+        meta = self.meta[i]
+        if meta and self.keys[i] == key:
+            self.hits += 1
+            return meta & 0xFF, (meta >> 8) & 0x3, ((meta >> 10) & 0xF) - 1, self.values[i]
+
+    def store(self, key, depth, bound, column, value):
+        i = key & self.mask
+        meta = self.meta[i]
+        if meta and self.keys[i] != key and meta >> 14 == self.gen and depth < meta & 0xFF:
+            return
+        self.keys[i] = key
+        self.values[i] = value
+        self.meta[i] = depth | bound << 8 | (column + 1) << 10 | self.gen << 14
+
+    def clear(self):
+        for a in (self.keys, self.values, self.meta):
+            a[:] = array(a.typecode, bytes(a.itemsize * len(a)))
+        self.nodes = self.probes = self.hits = 0
+
+TT = TranspositionTable()
+
+class OpeningBook:
+    """Best moves of early positions, read from the file written by c4_book.py.
+
+    The file is a header followed by sorted little-endian uint64 records (key << 3 | column),
+    memory-mapped on first use and binary searched, so nothing is loaded at startup and every
+    worker process shares the same pages. Only one of a position and its mirror is stored.
+    """
+
+    def __init__(self, path=BOOK_FILE):
+        self.path = path
+        self.mm = None
+        self.count = 0
+        self.opened = False
+
+    def _open(self):
+        self.opened = True
+        try:
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            log.info(f"No opening book at {self.path}, searching from the first move.")
+            return
+        except (OSError, ValueError) as e:  # ValueError: an empty file can't be mapped
+            log.warning(f"Opening book {self.path} unreadable, running without it | {e}")
+            return
+        try:
+            magic, self.ply, count = BOOK_HEADER.unpack_from(mm)
+        except struct.error:
+            magic = count = None
+        if magic == BOOK_MAGIC and len(mm) == BOOK_HEADER.size + 8 * count:
+            self.mm, self.count = mm, count
+        else:
+            mm.close()
+            log.warning(f"Opening book {self.path} truncated or not a book, running without it.")
+
+    def _find(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = struct.unpack_from("<Q", self.mm, BOOK_HEADER.size + 8 * mid)[0]
+            if record >> 3 < key:
+                lo = mid + 1
+            elif record >> 3 > key:
+                hi = mid
+            else:
+                return record & 0x7
+
+    def lookup(self, board):
+        if not self.opened:
+            self._open()
+        if not self.mm or board.count > self.ply:
+            return None
+        key, mirrored_key = board.book_keys()
+        col = self._find(key)
+        if col is None:
+            col = self._find(mirrored_key)
+            col = None if col is None else COLS - 1 - col
+        return col if col is not None and board.can_play(col) else None
+
+BOOK = OpeningBook()
+
+def minimax(transposition_table, board, depth, alpha, beta, maximizingPlayer, ai_turn, player_piece, deadline=None):
+    transposition_table.nodes += 1
+    if board.won(ai_turn):
+        return (None, WIN_SCORE)
+    if board.won(player_piece):
+        return (None, LOSS_SCORE)
+    if board.is_full():  # Game is over, no more valid moves
+        return (None, 0)
+    if depth == 0:
+        return (None, board.score(ai_turn))
+
+    if deadline and depth > 1 and time.monotonic() > deadline:
+        raise SearchTimeout
+    key = board.hash ^ SEARCH_KEYS[ai_turn, maximizingPlayer]
+    valid_locations = board.valid_moves()
+    entry = transposition_table.probe(key)
+    if entry:
+        tt_depth, bound, tt_column, tt_value = entry
+        if tt_depth >= depth:
+            if bound == EXACT:
+                return tt_column, tt_value
+            if bound == LOWER:
+                alpha = max(alpha, tt_value)
+            else:
+                beta = min(beta, tt_value)
+            if alpha >= beta:
+                return tt_column, tt_value
+        valid_locations.remove(tt_column)
+        valid_locations.insert(0, tt_column)  # best move of an earlier search first
+    alpha0, beta0 = alpha, beta
+
+    if maximizingPlayer:
+        value = -math.inf
+        best_column = random.choice(valid_locations)
+        for col in valid_locations:
+            board.play(col, ai_turn)
+            new_score = minimax(transposition_table, board, depth-1, alpha, beta, False, ai_turn, player_piece, deadline)[1]
+            board.undo(col)
+            if new_score > value:
+                value = new_score
+                best_column = col
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+    else:  # Minimizing player
+        value = math.inf
+        best_column = random.choice(valid_locations)
+        for col in valid_locations:
+            board.play(col, player_piece)
+            new_score = minimax(transposition_table, board, depth-1, alpha, beta, True, ai_turn, player_piece, deadline)[1]
+            board.undo(col)
+            if new_score < value:
+                value = new_score
+                best_column = col
+            beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+    bound = UPPER if value <= alpha0 else LOWER if value >= beta0 else EXACT
+    transposition_table.store(key, depth, bound, best_column, value)
+    return best_column, value
+
+def forced_move(board, ai_turn):
+    opponent_piece = 1 if ai_turn == 2 else 2
+    valid_locations = board.valid_moves()
+
+    # 1. Check for AI's immediate winning move
+    for col in valid_locations:
+        if board.wins_at(col, ai_turn):
+            return col  # Immediate win found
+
+    # 2. Check for opponent's immediate winning move and block it
+    for col in valid_locations:
+        if board.wins_at(col, opponent_piece):
+            return col  # Block opponent's win
+
+def get_ai_move(board, ai_turn, budget_ms, transposition_table=TT, book=BOOK, max_depth=ROWS * COLS):
+    """Iterative deepening under a time budget, returns (column, time taken, depth reached).
+
+    Each iteration leaves its best moves in the table, where the next one picks them up as its
+    first candidates. When the deadline hits mid-iteration, the last completed one is kept.
+    Positions found in the opening book are answered from it without searching.
+    """
+    t = time.monotonic()
+    opponent_piece = 1 if ai_turn == 2 else 2
+    valid_locations = board.valid_moves()
+
+    # 1. Win right away, or 2. block the opponent's immediate win
+    if (col := forced_move(board, ai_turn)) is not None:
+        return col, round(time.monotonic() - t, 3), 0
+
+    # 3. Play from the opening book when it is our turn in a known position
+    if book and 1 + board.count % 2 == ai_turn and (col := book.lookup(board)) is not None:
+        return col, round(time.monotonic() - t, 3), 0
+
+    # 4. Deepen minimax until the budget runs out or the game tree is exhausted
+    transposition_table.new_search()
+    deadline = t + budget_ms / 1000
+    search_board = board.copy()  # a timeout unwinds without undoing the moves in flight
+    column, depth = random.choice(valid_locations), 0
+    for d in range(1, min(max_depth, ROWS * COLS - board.count) + 1):
+        try:
+            col, minimax_score = minimax(transposition_table, search_board, d, -math.inf, math.inf, True, ai_turn, opponent_piece, deadline)
+        except SearchTimeout:
+            break
+        if col is not None:
+            column, depth = col, d
+        if minimax_score >= WIN_SCORE or minimax_score <= LOSS_SCORE:
+            break  # forced result, deeper search can't change it
+
+    return column, round(time.monotonic() - t, 3), depth
+
+def score_move(board, col, ai_turn, budget_ms, alpha=-math.inf, transposition_table=TT):
+    """Value of ai_turn playing col, deepened until the budget runs out: (score, depth, bound, time taken).
+
+    Root-parallel searches call this once per root move. A score at or below alpha only proves the
+    move is no better than alpha and comes back as an UPPER bound.
+    """
+    t = time.monotonic()
+    deadline = t + budget_ms / 1000
+    opponent_piece = 1 if ai_turn == 2 else 2
+    search_board = board.copy()
+    search_board.play(col, ai_turn)
+    transposition_table.new_search()
+    score, depth = None, 0
+    for d in range(ROWS * COLS - search_board.count + 1):
+        try:
+            s = minimax(transposition_table, search_board, d, alpha, math.inf, False, ai_turn, opponent_piece, deadline)[1]
+        except SearchTimeout:
+            break
+        score, depth = s, d + 1
+        if s >= WIN_SCORE or s <= LOSS_SCORE:
+            break  # forced result, deeper search can't change it
+    bound = UPPER if score <= alpha else EXACT
+    return score, depth, bound, round(time.monotonic() - t, 3)
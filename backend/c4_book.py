@@ -0,0 +1,50 @@
+# backend/c4_book.py
+# Offline opening book generator: python c4_book.py --ply 4 --ms 1000 [--out db/c4_book.bin]
+
+import argparse, time
+import c4
+
+def positions(board, ply, seen):
+    """Every reachable, unfinished position up to ply moves, one of each mirror pair."""
+    key, mirrored_key = board.book_keys()
+    if min(key, mirrored_key) in seen:
+        return
+    seen.add(min(key, mirrored_key))
+    yield board
+    if board.count == ply:
+        return
+    piece = 1 + board.count % 2
+    for col in board.valid_moves():
+        board.play(col, piece)
+        if not board.won(piece):
+            yield from positions(board, ply, seen)
+        board.undo(col)
+
+def build(ply, budget_ms):
+    records = []
+    t = time.monotonic()
+    for board in positions(c4.Board(), ply, set()):
+        col, _, depth = c4.get_ai_move(board, 1 + board.count % 2, budget_ms, book=None)
+        key, mirrored_key = board.book_keys()
+        if mirrored_key < key:
+            key, col = mirrored_key, c4.COLS - 1 - col
+        records.append(key << 3 | col)
+        if len(records) % 100 == 0:
+            print(f"{len(records)} positions in {round(time.monotonic() - t)}s")
+    return sorted(records)
+
+def write(path, ply, records):
+    with open(path, "wb") as f:
+        f.write(c4.BOOK_HEADER.pack(c4.BOOK_MAGIC, ply, len(records)))
+        for record in records:
+            f.write(record.to_bytes(8, "little"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute Connect 4 opening moves.")
+    parser.add_argument("--ply", type=int, default=4, help="deepest position, in moves played")
+    parser.add_argument("--ms", type=int, default=1000, help="search budget per position")
+    parser.add_argument("--out", default=c4.BOOK_FILE)
+    args = parser.parse_args()
+    records = build(args.ply, args.ms)
+    write(args.out, args.ply, records)
+    print(f"{len(records)} positions up to ply {args.ply} written to {args.out}.")
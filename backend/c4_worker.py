@@ -0,0 +1,28 @@
+# backend/c4_worker.py
+# Search worker spawned by pool.SearchPool: one JSON request per stdin line, one JSON reply per stdout line.
+
+import sys, json, math
+import c4
+
+def get_ai_move(moves, turn, budget_ms):
+    col, time_taken, depth = c4.get_ai_move(c4.Board.from_moves(moves), turn, budget_ms)
+    return {"col": col, "time_taken": time_taken, "depth": depth}
+
+def score_move(moves, col, turn, budget_ms, alpha=None):
+    score, depth, bound, time_taken = c4.score_move(c4.Board.from_moves(moves), col, turn, budget_ms, -math.inf if alpha is None else alpha)
+    return {"col": col, "score": score, "depth": depth, "exact": bound == c4.EXACT, "time_taken": time_taken}
+
+FUNCTIONS = {"get_ai_move": get_ai_move, "score_move": score_move}
+
+def main():
+    for line in sys.stdin:
+        req = json.loads(line)
+        try:
+            reply = {"ok": True, "result": FUNCTIONS[req["fn"]](**req["args"])}
+        except Exception as e:
+            reply = {"ok": False, "error": repr(e)}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
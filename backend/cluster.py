@@ -0,0 +1,36 @@
+# backend/cluster.py
+# Runs WORKERS copies of app.py on the same port (SO_REUSEPORT, the kernel spreads connections) around one bus broker.
+# With WORKERS=1 it is just app.py.
+
+import eventlet
+eventlet.monkey_patch()
+
+import os, sys, signal, logging
+from eventlet.green import subprocess
+import bus
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s] [%(levelname)s] %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S")
+log = logging.getLogger(__name__)
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+if __name__ == "__main__":
+    if bus.WORKERS <= 1:
+        os.execv(sys.executable, [sys.executable, APP])
+
+    eventlet.spawn(bus.serve)
+    eventlet.sleep(0)
+    workers = [subprocess.Popen([sys.executable, APP], env={**os.environ, "WORKER_INDEX": str(i)}) for i in range(bus.WORKERS)]
+    log.info(f"{bus.WORKERS} workers started.")
+
+    def stop(*_):
+        for p in workers:
+            p.terminate()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for p in workers:
+        p.wait()
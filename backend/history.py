@@ -0,0 +1,282 @@
+# backend/history.py
+
+import os, gzip, json, sqlite3, logging, threading
+from eventlet import tpool
+from store import JournalStore
+
+log = logging.getLogger(__name__)
+
+HISTORY_DB = os.environ.get("HISTORY_DB", "db/history.sqlite3")
+ARCHIVE_DIR = os.environ.get("HISTORY_ARCHIVE_DIR", os.path.join(os.path.dirname(HISTORY_DB), "history"))
+ARCHIVE_AGE = int(os.environ.get("HISTORY_ARCHIVE_DAYS", 30)) * 86400  # games older than this leave SQLite for the segments
+SEGMENT_SPAN = int(os.environ.get("HISTORY_SEGMENT_DAYS", 7)) * 86400  # time covered by one segment file
+ARCHIVE_BATCH = 5000  # games moved per archive() call
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    gid TEXT NOT NULL, rid TEXT NOT NULL, date INTEGER NOT NULL, has_ai INTEGER NOT NULL, data TEXT NOT NULL,
+    PRIMARY KEY (gid, rid));
+CREATE INDEX IF NOT EXISTS games_by_date ON games (gid, date DESC, rid DESC);
+CREATE TABLE IF NOT EXISTS game_players (
+    pid TEXT NOT NULL, gid TEXT NOT NULL, rid TEXT NOT NULL, date INTEGER NOT NULL,
+    PRIMARY KEY (pid, gid, date DESC, rid DESC)) WITHOUT ROWID;
+"""
+
+def pack(saved_room):
+    """The compact form of a saved room: players as a list, referred to by position, and each round as its
+    winner's position (-1 for none) plus its moves as one string, c4 columns as digits and rps steps as
+    one letter per player ("-" once out) separated by commas. A room not in game_over's shape, from an
+    old dataset, is kept whole under "raw"."""
+    try:
+        pids = list(saved_room["players"])
+        rounds = []
+        for r in saved_room["rounds"]:
+            winner = pids.index(r["winner"]) if r["winner"] in pids else -1
+            if "moves" in r:
+                rounds.append([winner, "".join(map(str, r["moves"]))])
+            else:
+                rounds.append([winner, ",".join("".join(m or "-" for m in step) for step in r["steps"])])
+        return {"d": saved_room["date"], "s": saved_room["max_spec"], "r": rounds,
+            "p": [[pid, v["team"], int(v["is_ai"]), v["w"], v["l"]] for pid, v in saved_room["players"].items()]}
+    except (KeyError, TypeError, ValueError):
+        return {"d": saved_room.get("date", 0), "raw": saved_room}
+
+def unpack(gid, record):
+    """The saved room a packed record came from. Rows written before packing are returned as they are."""
+    if "d" not in record:
+        return record
+    if "raw" in record:
+        return record["raw"]
+    pids = [p[0] for p in record["p"]]
+    rounds = []
+    for i, (winner, moves) in enumerate(record["r"]):
+        r = {"index": i + 1, "winner": pids[winner] if winner >= 0 else None}
+        if gid == "c4":
+            r["moves"] = [int(c) for c in moves]
+        else:
+            r["steps"] = [["" if m == "-" else m for m in step] for step in moves.split(",")] if moves else []
+        rounds.append(r)
+    return {"date": record["d"], "max_spec": record["s"],
+        "players": {pid: {"team": team, "is_ai": bool(is_ai), "w": w, "l": l} for pid, team, is_ai, w, l in record["p"]},
+        "rounds": rounds}
+
+class History:
+    """Finished games, recent ones in SQLite and older ones in compressed segment files.
+
+    SQLite keeps one row per game plus one row per (player, game) for the player filter. Pages are
+    ordered newest first and walked with a (date, rid) cursor, so a page costs the same however many
+    games were played before it. Games are stored packed (see pack), and unpacked into the saved room
+    game_over built when read.
+
+    archive() moves games older than ARCHIVE_AGE out of SQLite into gzipped JSON-lines segments, one per
+    game and SEGMENT_SPAN of time, newest first inside. Their game_players rows stay: a player's page
+    still walks that index, and reads the archived games it lists from the segments their dates fall
+    in, parsing only the matching lines. A page without a player filter that runs past the SQLite rows
+    carries on by streaming the segments from the cursor back. Segment files are read and written in
+    tpool threads, off the eventlet hub.
+    """
+
+    def __init__(self, path=HISTORY_DB, archive_dir=ARCHIVE_DIR):
+        self.path = path
+        self.archive_dir = archive_dir
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes on a new file, lets archive() hand pages back
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def add(self, gid, rid, saved_room):
+        self.add_many(gid, [(rid, saved_room)])
+
+    def add_many(self, gid, items):
+        games, players = [], []
+        for rid, saved_room in items:
+            has_ai = any(v.get("is_ai") for v in saved_room["players"].values())
+            games.append((gid, rid, saved_room["date"], int(has_ai), json.dumps(pack(saved_room), separators=(",", ":"))))
+            players.extend((pid, gid, rid, saved_room["date"]) for pid in saved_room["players"])
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?)", games)
+            self.db.executemany("INSERT OR REPLACE INTO game_players VALUES (?, ?, ?, ?)", players)
+
+    def page(self, gid, limit=PAGE_SIZE, cursor=None, player=None, since=None, until=None, has_ai=None):
+        """Returns ([(rid, saved_room), ...], next cursor or None), newest first."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = parse_cursor(cursor) if cursor else None
+        if player:
+            games = self._player_page(gid, player, limit + 1, after, since, until, has_ai)
+        else:
+            games = self._game_page(gid, limit + 1, after, since, until, has_ai)
+        next_cursor = f"{games[limit - 1][1]['date']}:{games[limit - 1][0]}" if len(games) > limit else None
+        return games[:limit], next_cursor
+
+    def _game_page(self, gid, n, after, since, until, has_ai):
+        sql, params = "SELECT rid, data FROM games WHERE gid = ?", [gid]
+        if after:
+            sql += " AND (date, rid) < (?, ?)"
+            params += after
+        if since is not None:
+            sql += " AND date >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND date <= ?"
+            params.append(until)
+        if has_ai is not None:
+            sql += " AND has_ai = ?"
+            params.append(int(has_ai))
+        sql += " ORDER BY date DESC, rid DESC LIMIT ?"
+        params.append(n)
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+
+        games = [(rid, unpack(gid, json.loads(data))) for rid, data in rows]
+        if len(games) < n:  # SQLite ran out, older games are in the segments
+            after = (games[-1][1]["date"], games[-1][0]) if games else after
+            games += tpool.execute(self._archived_page, gid, n - len(games), after, since, until, has_ai)
+        return games
+
+    def _archived_page(self, gid, n, after, since, until, has_ai):
+        games = []
+        for rid, saved_room in self.archived(gid, after):
+            if since is not None and saved_room["date"] < since or len(games) == n:
+                break
+            if until is not None and saved_room["date"] > until:
+                continue
+            if has_ai is not None and any(v.get("is_ai") for v in saved_room["players"].values()) != bool(has_ai):
+                continue
+            games.append((rid, saved_room))
+        return games
+
+    def _player_page(self, gid, player, n, after, since, until, has_ai):  # the player's index covers archived games too
+        games = []
+        while len(games) < n:
+            sql = ("SELECT p.rid, p.date, g.data FROM game_players p LEFT JOIN games g ON g.gid = p.gid AND g.rid = p.rid"
+                " WHERE p.pid = ? AND p.gid = ?")
+            params = [player, gid]
+            if after:
+                sql += " AND (p.date, p.rid) < (?, ?)"
+                params += after
+            if since is not None:
+                sql += " AND p.date >= ?"
+                params.append(since)
+            if until is not None:
+                sql += " AND p.date <= ?"
+                params.append(until)
+            if has_ai is not None:  # archived games have no row to filter on, checked below
+                sql += " AND (g.has_ai = ? OR g.rid IS NULL)"
+                params.append(int(has_ai))
+            want = n - len(games)
+            sql += " ORDER BY p.date DESC, p.rid DESC LIMIT ?"
+            params.append(want)
+            with self.lock:
+                rows = self.db.execute(sql, params).fetchall()
+            archived = [(date, rid) for rid, date, data in rows if data is None]
+            found = tpool.execute(self._read_archived, gid, archived) if archived else {}
+            for rid, date, data in rows:
+                saved_room = unpack(gid, json.loads(data)) if data is not None else found.get(rid)
+                if saved_room is None or data is None and has_ai is not None and any(v.get("is_ai") for v in saved_room["players"].values()) != bool(has_ai):
+                    continue
+                games.append((rid, saved_room))
+            if len(rows) < want:
+                break
+            after = (rows[-1][1], rows[-1][0])
+        return games
+
+    def _read_archived(self, gid, keys):
+        """{rid: saved room} of the archived games keyed (date, rid), reading only the segments they are in."""
+        segments = self.segments(gid)
+        wanted = {}  # path -> rids
+        for date, rid in keys:
+            path = next((path for start, path in segments if start <= date), None)
+            if path:
+                wanted.setdefault(path, set()).add(rid)
+        found = {}
+        for path, rids in wanted.items():
+            with gzip.open(path, "rt") as f:
+                for line in f:  # lines are ["rid",{...}], the rid is checked before parsing
+                    if line[2:line.index('"', 2)] in rids:
+                        rid, record = json.loads(line)
+                        found[rid] = unpack(gid, record)
+                        rids.discard(rid)
+                        if not rids:
+                            break
+        return found
+
+    def segments(self, gid):  # [(start date, path)], newest first
+        try:
+            names = os.listdir(self.archive_dir)
+        except FileNotFoundError:
+            return []
+        starts = [int(n[len(gid) + 1:-len(".jsonl.gz")]) for n in names if n.startswith(f"{gid}-") and n.endswith(".jsonl.gz")]
+        return [(start, os.path.join(self.archive_dir, f"{gid}-{start}.jsonl.gz")) for start in sorted(starts, reverse=True)]
+
+    def archived(self, gid, after=None):
+        """Streams (rid, saved room) from the segments, newest first, older than after, a (date, rid) pair."""
+        for start, path in self.segments(gid):
+            if after and start > after[0]:  # all of it is newer
+                continue
+            with gzip.open(path, "rt") as f:
+                for line in f:
+                    rid, record = json.loads(line)
+                    if after and (record["d"], rid) >= after:
+                        continue
+                    yield rid, unpack(gid, record)
+
+    def archive(self, before, batch=ARCHIVE_BATCH):
+        """Moves up to batch games dated before `before` into the segments, returns how many moved.
+
+        Segments are written before the rows go, and a page resumes in them only past its last SQLite row,
+        so a page read in between never sees a game twice.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT gid, rid, data FROM games WHERE date < ? ORDER BY date LIMIT ?", (before, batch)).fetchall()
+        if not rows:
+            return 0
+        tpool.execute(self._write_segments, rows)
+        with self.lock:
+            with self.db:
+                self.db.executemany("DELETE FROM games WHERE gid = ? AND rid = ?", [(gid, rid) for gid, rid, _ in rows])
+            self.db.executescript("PRAGMA incremental_vacuum;")  # run to the end, execute() would free a single page
+        log.info(f"{len(rows)} games archived to {self.archive_dir}.")
+        return len(rows)
+
+    def _write_segments(self, rows):
+        segments = {}
+        for gid, rid, data in rows:
+            record = json.loads(data)
+            record = record if "d" in record else pack(record)
+            segments.setdefault((gid, record["d"] // SEGMENT_SPAN * SEGMENT_SPAN), []).append((rid, record))
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for (gid, start), games in segments.items():
+            path = os.path.join(self.archive_dir, f"{gid}-{start}.jsonl.gz")
+            if os.path.exists(path):  # kept sorted, so a segment getting more games is rewritten whole
+                with gzip.open(path, "rt") as f:
+                    kept = [tuple(json.loads(line)) for line in f]
+                # by rid, new rows last: a batch whose rows outlived a crash after its segment write is written again
+                games = list({rid: (rid, record) for rid, record in kept + games}.values())
+            games.sort(key=lambda g: (g[1]["d"], g[0]), reverse=True)
+            with gzip.open(f"{path}.tmp", "wt") as f:
+                f.writelines(json.dumps(g, separators=(",", ":")) + "\n" for g in games)
+            os.replace(f"{path}.tmp", path)
+
+    def migrate_json(self, gid, path):
+        """One-time import of a {gid}_rooms_hist.json dataset (snapshot plus journal), renamed to .migrated afterwards."""
+        if not os.path.exists(path) and not os.path.exists(f"{path}.log"):
+            return 0
+        data = JournalStore(path).load(compact=False)
+        self.add_many(gid, data.items())
+        for p in [path, f"{path}.log"]:
+            if os.path.exists(p):
+                os.replace(p, f"{p}.migrated")
+        log.info(f"{path} migrated to {self.path}, {len(data)} games.")
+        return len(data)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+def parse_cursor(cursor):
+    date, _, rid = cursor.partition(":")
+    return int(date), rid
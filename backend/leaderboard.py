@@ -0,0 +1,93 @@
+# backend/leaderboard.py
+
+import os
+from bisect import bisect_left, insort
+
+MIN_GAMES = int(os.environ.get("LEADERBOARD_MIN_GAMES", 5))  # rounds played before a player is ranked
+TOP_SIZE = 100  # entries kept up to date for leaderboard viewers
+BLOCK_SIZE = 512  # keys per block, a block is split when it reaches twice this
+
+class Leaderboard:
+    """Players of one game, ordered by win rate, then wins, then rounds played.
+
+    The order lives in sorted blocks of at most 2 * BLOCK_SIZE keys, with the last key of each block
+    alongside. Updating a player after a game finds its block by binary search over those, then
+    inserts or deletes within that block only, so the memmove is bounded by the block size rather
+    than the number of players. A rank adds up the sizes of the blocks before it, and the top N or a
+    page is read off the first blocks, so neither needs a full sort.
+    Players with fewer than min_games rounds are left out.
+    """
+
+    def __init__(self, gid, min_games=MIN_GAMES):
+        self.gid = gid
+        self.min_games = min_games
+        self.blocks = []  # sorted runs of (-r, -w, -played, pid), each non-empty
+        self.maxes = []  # last key of each block
+        self.key_of = {}  # pid -> its key in the blocks
+        self.size = 0
+
+    @staticmethod
+    def _key(pid, stats):
+        return (-stats.get("r", 0.0), -stats.get("w", 0), -(stats.get("w", 0) + stats.get("l", 0)), pid)
+
+    def build(self, pid_player):
+        self.key_of = {pid: self._key(pid, p[self.gid]) for pid, p in pid_player.items()
+            if self.gid in p and p[self.gid].get("w", 0) + p[self.gid].get("l", 0) >= self.min_games}
+        keys = sorted(self.key_of.values())
+        self.blocks = [keys[i:i + BLOCK_SIZE] for i in range(0, len(keys), BLOCK_SIZE)]
+        self.maxes = [block[-1] for block in self.blocks]
+        self.size = len(keys)
+        return self
+
+    def update(self, pid, stats):
+        old = self.key_of.pop(pid, None)
+        if old is not None:
+            self._remove(old)
+        if stats.get("w", 0) + stats.get("l", 0) >= self.min_games:
+            key = self.key_of[pid] = self._key(pid, stats)
+            self._insert(key)
+
+    def _insert(self, key):
+        if not self.blocks:
+            self.blocks, self.maxes = [[key]], [key]
+        else:
+            b = min(bisect_left(self.maxes, key), len(self.blocks) - 1)
+            block = self.blocks[b]
+            insort(block, key)
+            self.maxes[b] = block[-1]
+            if len(block) >= 2 * BLOCK_SIZE:
+                self.blocks[b:b + 1] = block[:BLOCK_SIZE], block[BLOCK_SIZE:]
+                self.maxes[b:b + 1] = block[BLOCK_SIZE - 1], block[-1]
+        self.size += 1
+
+    def _remove(self, key):
+        b = bisect_left(self.maxes, key)
+        block = self.blocks[b]
+        del block[bisect_left(block, key)]
+        if block:
+            self.maxes[b] = block[-1]
+        else:
+            del self.blocks[b], self.maxes[b]
+        self.size -= 1
+
+    def top(self, n=TOP_SIZE, offset=0):
+        pids = []
+        for block in self.blocks:
+            if offset >= len(block):
+                offset -= len(block)
+                continue
+            pids.extend(key[3] for key in block[offset:offset + n - len(pids)])
+            offset = 0
+            if len(pids) >= n:
+                break
+        return pids
+
+    def rank(self, pid):  # 1-based, None when unranked
+        key = self.key_of.get(pid)
+        if key is None:
+            return None
+        b = bisect_left(self.maxes, key)
+        return sum(map(len, self.blocks[:b])) + bisect_left(self.blocks[b], key) + 1
+
+    def __len__(self):
+        return self.size
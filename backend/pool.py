@@ -0,0 +1,94 @@
+# backend/pool.py
+
+import os, sys, json, logging
+import eventlet
+from eventlet.green import subprocess
+from eventlet.queue import Queue
+from eventlet.semaphore import Semaphore
+
+log = logging.getLogger(__name__)
+
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "c4_worker.py")
+
+class SearchPool:
+    """Worker processes running CPU-bound searches off the eventlet hub.
+
+    Each job runs in its own greenthread that checks out an idle worker, writes the request and
+    blocks on the green pipe, so the hub keeps serving other sockets meanwhile. Jobs are tagged
+    (by rid) so they can be cancelled together; a cancelled worker is killed and replaced.
+    Background jobs (HELP analysis) never hold more than size - 1 workers, leaving one for AI turns;
+    a pool of size 1 starts a second worker for them rather than let HELP take the only one.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or os.cpu_count() or 1
+        self.idle = Queue()
+        self.jobs = {}  # tag -> set of greenthreads
+        self.background_width = max(1, self.size - 1)
+        self.background_slots = Semaphore(self.background_width)
+        workers = max(self.size, self.background_width + 1)
+        for _ in range(workers):
+            self.idle.put(self._spawn())
+        log.info(f"Search pool started with {workers} workers.")
+
+    def _spawn(self):
+        return subprocess.Popen([sys.executable, WORKER], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def submit(self, tag, fn, args, callback, background=False):
+        """args may be a callable, evaluated when a worker picks the job up. callback gets the result,
+        or None when the worker died or the search raised, so callers always hear back unless cancelled."""
+        gt = eventlet.spawn(self._run, tag, fn, args, callback, background)
+        self.jobs.setdefault(tag, set()).add(gt)
+        return gt
+
+    def _run(self, tag, fn, args, callback, background):
+        proc, line, slot = None, b"", None
+        try:
+            if background:
+                self.background_slots.acquire()
+                slot = self.background_slots
+            proc = self.idle.get()
+            if proc.poll() is not None:  # died while idle
+                log.warning(f"Search worker exited with {proc.returncode} while idle, replacing it.")
+                proc = self._spawn()
+            try:
+                if callable(args):
+                    args = args()
+                proc.stdin.write(json.dumps({"fn": fn, "args": args}).encode() + b"\n")
+                proc.stdin.flush()
+                line = proc.stdout.readline()
+            except Exception as e:  # broken pipe, or args() raised: handled like a crash below
+                log.error(f"Search {fn} could not be sent | tag: {tag} | {e!r}")
+        finally:
+            if proc and not line:  # cancelled or crashed mid-search
+                proc.kill()
+                proc.wait()
+                proc = self._spawn()
+            if proc:
+                self.idle.put(proc)
+            if slot:
+                slot.release()
+            self.jobs.get(tag, set()).discard(eventlet.getcurrent())
+            if not self.jobs.get(tag, True):
+                del self.jobs[tag]
+
+        if not line:
+            log.error(f"Search worker died during {fn} | tag: {tag}.")
+            return callback(None)
+        reply = json.loads(line)
+        if not reply["ok"]:
+            log.error(f"Search {fn} failed | tag: {tag} | {reply['error']}")
+            return callback(None)
+        callback(reply["result"])
+
+    def cancel(self, tag):
+        for gt in self.jobs.pop(tag, ()):
+            gt.kill()
+
+    def close(self):
+        for tag in list(self.jobs):
+            self.cancel(tag)
+        while not self.idle.empty():
+            proc = self.idle.get()
+            proc.stdin.close()
+            proc.wait()
@@ -0,0 +1,78 @@
+# backend/room.py
+# Live room state as __slots__ objects. to_json() gives the shape clients and the rooms files have always seen,
+# and is only called at the edges: patches, resyncs, room files and saved games.
+
+ROWS, COLS = 6, 7
+OUT = "-"  # rps step letter of a player already out of the round
+
+class Player:
+    """A seat in a room. on and cmove only exist in rps games and stay None in c4. away is set while the
+    player is disconnected and their seat is kept for them, see sessions.py."""
+
+    __slots__ = ("team", "is_ai", "status", "on", "cmove", "w", "l", "away")
+
+    def __init__(self, gid, team, is_ai, status):
+        self.team = team
+        self.is_ai = is_ai
+        self.status = status
+        self.on = True if gid == "rps" else None
+        self.cmove = None
+        self.w = 0
+        self.l = 0
+        self.away = False
+
+    def to_json(self):
+        if self.on is None:
+            data = {"team": self.team, "is_ai": self.is_ai, "status": self.status, "w": self.w, "l": self.l}
+        else:
+            data = {"team": self.team, "is_ai": self.is_ai, "status": self.status, "on": self.on, "cmove": self.cmove, "w": self.w, "l": self.l}
+        if self.away:
+            data["away"] = True
+        return data
+
+class Round:
+    """rps keeps each step as a string, one move letter per player or OUT; c4 keeps the columns played, one byte each."""
+
+    __slots__ = ("index", "winner", "steps", "moves")
+
+    def __init__(self, gid, index):
+        self.index = index
+        self.winner = None
+        self.steps = [] if gid == "rps" else None
+        self.moves = bytearray() if gid == "c4" else None
+
+    def to_json(self):
+        if self.moves is None:
+            return {"index": self.index, "winner": self.winner, "steps": [["" if m == OUT else m for m in step] for step in self.steps]}
+        return {"index": self.index, "winner": self.winner, "moves": list(self.moves)}
+
+class Room:
+    """An open room. The c4 grid is one bytearray, row by row from the top, None in rps."""
+
+    __slots__ = ("gid", "status", "wins2win", "rsize", "max_spec", "spec", "players", "rounds", "grid", "winner")
+
+    def __init__(self, gid, status):
+        self.gid = gid
+        self.status = status
+        self.wins2win = 2
+        self.rsize = 2
+        self.max_spec = 0
+        self.spec = []
+        self.players = {}  # pid -> Player, in joining order
+        self.rounds = [Round(gid, 1)]
+        self.grid = bytearray(ROWS * COLS) if gid == "c4" else None
+        self.winner = None
+
+    def new_round(self):
+        self.rounds.append(Round(self.gid, len(self.rounds) + 1))
+        if self.grid is not None:
+            self.grid = bytearray(ROWS * COLS)
+
+    def to_json(self):
+        data = {"status": self.status, "wins2win": self.wins2win, "rsize": self.rsize, "max_spec": self.max_spec, "spec": self.spec,
+            "players": {pid: p.to_json() for pid, p in self.players.items()}, "rounds": [r.to_json() for r in self.rounds]}
+        if self.grid is not None:
+            data["grid"] = [list(self.grid[row * COLS:(row + 1) * COLS]) for row in range(ROWS)]
+        if self.winner:
+            data["winner"] = self.winner
+        return data
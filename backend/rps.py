@@ -0,0 +1,18 @@
+# backend/rps.py
+
+import random
+
+MOVES = ["R", "P", "S"]
+
+# blackbox fun
+def get_result(player_move):
+    rules = {"R": "S", "P": "R", "S": "P"}
+    if len(unique_moves := set(player_move.values())) == 1:
+        return list(player_move.keys())
+    beaten_by = {move: {m for m, beats in rules.items() if beats == move} for move in unique_moves}
+    winning_moves = {move for move in unique_moves if not beaten_by[move] & unique_moves}
+    return list(player_move.keys()) if not winning_moves else [
+        player for player, move in player_move.items() if move in winning_moves]
+
+def get_ai_move():
+    return random.choice(MOVES)
@@ -0,0 +1,67 @@
+# backend/sessions.py
+
+import os, math, logging
+import eventlet
+
+log = logging.getLogger(__name__)
+
+GRACE = float(os.environ.get("SESSION_GRACE", 30.0))  # seconds a disconnected player keeps their seats
+TICK = 1.0  # seconds per wheel slot, expiries are batched at this resolution
+
+class Sessions:
+    """Players who lost their connection, resumable for a grace period before their seats are given up.
+
+    Each session is a snapshot, whatever the caller needs to give up the seats later, and expires on
+    a timer wheel: a ring of slots, one per tick, turned by a single greenthread. A session goes in the
+    slot the hand reaches last, at least grace seconds away, and each turn hands a whole slot to
+    on_expire(snapshots by pid) at once, so a burst of disconnects costs a few batches rather than a
+    timer per player. resume() takes a session out of its slot before that.
+    """
+
+    def __init__(self, on_expire, grace=GRACE, tick=TICK):
+        self.on_expire = on_expire
+        self.tick = tick
+        self.slots = [{} for _ in range(math.ceil(grace / tick) + 2)]  # pid -> snapshot
+        self.hand = 0
+        self.slot_of = {}  # pid -> index of the slot holding its session
+        self.stats = {"suspended": 0, "resumed": 0, "expired": 0, "batches": 0}
+        eventlet.spawn(self._run)
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def suspend(self, pid, snapshot):  # suspending again restarts the grace period
+        self._take(pid)
+        i = self.slot_of[pid] = (self.hand - 1) % len(self.slots)
+        self.slots[i][pid] = snapshot
+        self.stats["suspended"] += 1
+
+    def resume(self, pid):  # the snapshot, None when there is no session or it already expired
+        snapshot = self._take(pid)
+        if snapshot is not None:
+            self.stats["resumed"] += 1
+        return snapshot
+
+    def _take(self, pid):
+        i = self.slot_of.pop(pid, None)
+        return None if i is None else self.slots[i].pop(pid)
+
+    def _run(self):
+        while True:
+            eventlet.sleep(self.tick)
+            self.turn()
+
+    def turn(self):
+        self.hand = (self.hand + 1) % len(self.slots)
+        due = self.slots[self.hand]
+        if not due:
+            return
+        self.slots[self.hand] = {}
+        for pid in due:
+            del self.slot_of[pid]
+        self.stats["expired"] += len(due)
+        self.stats["batches"] += 1
+        try:
+            self.on_expire(due)
+        except Exception:
+            log.exception(f"Sessions | expiring {len(due)} sessions failed.")
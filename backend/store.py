@@ -0,0 +1,230 @@
+# backend/store.py
+
+import os, json, time, hashlib, logging, threading
+
+log = logging.getLogger(__name__)
+
+COMPACT_EVERY = int(os.environ.get("JOURNAL_COMPACT_EVERY", 500))
+FLUSH_INTERVAL = float(os.environ.get("FLUSH_INTERVAL", 1.0))  # seconds between background flushes
+FLUSH_THRESHOLD = int(os.environ.get("FLUSH_THRESHOLD", 100))  # updates that trigger an early flush
+CHECKSUM_PREFIX = b"#sha256:"  # first line of a snapshot, the JSON follows
+
+def write_snapshot(path, data, default=None, durable=False):
+    """Writes data as JSON behind a checksum line, to a temporary file renamed over path, so a crash
+    leaves either the old file or the new one. durable=True also syncs it to disk first and keeps the
+    file it replaces as path.bak."""
+    body = json.dumps(data, indent=4, default=default).encode()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(CHECKSUM_PREFIX + hashlib.sha256(body).hexdigest().encode() + b"\n" + body)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    if durable and os.path.exists(path):  # a second link, path itself never goes missing
+        if os.path.exists(f"{path}.bak.tmp"):
+            os.unlink(f"{path}.bak.tmp")
+        os.link(path, f"{path}.bak.tmp")
+        os.replace(f"{path}.bak.tmp", f"{path}.bak")
+    os.replace(tmp_path, path)
+    if durable:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def read_snapshot(path):
+    """The data of a snapshot, ValueError when its checksum or JSON is wrong. Files written before
+    checksums are plain JSON and read as such."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if raw.startswith(CHECKSUM_PREFIX):
+        header, _, raw = raw.partition(b"\n")
+        if hashlib.sha256(raw).hexdigest().encode() != header[len(CHECKSUM_PREFIX):]:
+            raise ValueError("checksum mismatch")
+    return json.loads(raw)
+
+class JournalStore:
+    """A dict kept on disk as a JSON snapshot plus an append-only log of changed top-level keys.
+
+    Each change appends one line, {"k": key, "v": value} or {"k": key} for a deletion, so the
+    cost of a write does not depend on the size of the dict. Once the log holds COMPACT_EVERY
+    records, the snapshot is rewritten and the log emptied. Loading replays the log over the
+    snapshot; a torn last line from a crash is skipped.
+
+    Compaction keeps the previous snapshot and log as .bak files. If the snapshot fails its checksum,
+    loading falls back to them and replays both logs, records already in the backup set the same
+    values again. With no readable copy at all, load() raises rather than start from an empty dict.
+    """
+
+    def __init__(self, path, compact_every=COMPACT_EVERY):
+        self.path = path
+        self.log_path = f"{path}.log"
+        self.compact_every = compact_every
+        self.pending = 0  # records in the log since the last compaction
+        self.lock = threading.Lock()
+
+    def _load_snapshot(self):  # (data, logs to replay over it)
+        try:
+            return read_snapshot(self.path), [self.log_path]
+        except FileNotFoundError:
+            if not os.path.exists(f"{self.path}.bak"):
+                return {}, [self.log_path]
+            error = "missing"
+        except ValueError as e:
+            error = e
+        log.error(f"Unable to read {self.path} ({error}), loading {self.path}.bak.")
+        return read_snapshot(f"{self.path}.bak"), [f"{self.log_path}.bak", self.log_path]
+
+    def _snapshot_id(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_ino, st.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self, compact=True):  # compact=False for readers of a file another process writes
+        while True:
+            before = self._snapshot_id()
+            data, logs, replayed = self._read()
+            if compact or self._snapshot_id() == before:
+                break
+            # the writer compacted meanwhile: the log read may already be the emptied one, read again
+            log.info(f"{self.path} compacted while loading, reading it again.")
+
+        log.info(f"{self.path} loaded, {replayed} journal records replayed.")
+        if len(logs) > 1 and compact and os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.damaged")  # kept for a look, and out of the way of the next backup
+        if (replayed or len(logs) > 1) and compact:
+            try:
+                self.compact(data)
+            except Exception as e:
+                log.error(f"Unable to compact {self.path}: {e}")
+        return data
+
+    def _read(self):  # (data, logs replayed, records replayed)
+        data, logs = self._load_snapshot()
+        replayed = 0
+        for log_path in logs:
+            try:
+                with open(log_path, "r") as f:
+                    for line in f:
+                        try:
+                            rec = json.loads(line)
+                        except ValueError:
+                            log.warning(f"Skipped torn record in {log_path}.")
+                            continue
+                        if "v" in rec:
+                            data[rec["k"]] = rec["v"]
+                        else:
+                            data.pop(rec["k"], None)
+                        replayed += 1
+            except FileNotFoundError:
+                pass
+        return data, logs, replayed
+
+    def record(self, data, keys):
+        lines = "".join(json.dumps({"k": k, "v": data[k]} if k in data else {"k": k}) + "\n" for k in keys)
+        with self.lock:
+            with open(self.log_path, "a") as f:
+                f.write(lines)
+            self.pending += len(keys)
+        if self.pending >= self.compact_every:
+            self.compact(data)
+
+    def compact(self, data):  # raises on failure, the log stays in place and keeps everything
+        with self.lock:
+            write_snapshot(self.path, data, durable=True)
+            if os.path.exists(self.log_path):
+                os.replace(self.log_path, f"{self.log_path}.bak")
+            open(self.log_path, "w").close()
+            self.pending = 0
+            log.info(f"{self.path} compacted.")
+
+class Flusher:
+    """Write-behind for every dataset file, run by a background (green) thread.
+
+    mark() only records that a file is dirty, with the live dict and the changed keys, so
+    several updates in one event, or in one interval, end up as a single write. Journaled
+    files get their changed keys appended, others are rewritten with save(path, data).
+    A flush runs every interval, or as soon as threshold updates are waiting, and on close().
+    A path whose write fails is logged and marked dirty again, to be retried at the next flush.
+    """
+
+    def __init__(self, journals, save, interval=FLUSH_INTERVAL, threshold=FLUSH_THRESHOLD):
+        self.journals = journals
+        self.save = save
+        self.interval = interval
+        self.threshold = threshold
+        self.dirty = {}  # path -> [data, changed keys or None for a full write, first mark time]
+        self.marks = 0
+        self.stats = {"marks": 0, "flushes": 0, "writes": 0, "errors": 0, "last_lag": 0.0, "max_lag": 0.0}
+        self.wake = threading.Event()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def mark(self, path, data, keys=None):
+        entry = self.dirty.get(path)
+        if entry is None:
+            entry = self.dirty[path] = [data, set(), time.monotonic()]
+        entry[0] = data
+        if keys is None or entry[1] is None:
+            entry[1] = None
+        else:
+            entry[1].update(keys)
+        self.marks += 1
+        self.stats["marks"] += 1
+        if self.marks >= self.threshold:
+            self.wake.set()
+
+    def _run(self):
+        while not self.closed:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        dirty, self.dirty, self.marks = self.dirty, {}, 0
+        if not dirty:
+            return
+        now = time.monotonic()
+        for path, (data, keys, since) in dirty.items():
+            try:
+                if path not in self.journals:
+                    self.save(path, data)
+                elif keys is None:
+                    self.journals[path].compact(data)
+                else:
+                    self.journals[path].record(data, keys)
+            except Exception as e:
+                log.error(f"Unable to write {path}, retrying at the next flush: {e}")
+                self.stats["errors"] += 1
+                self._requeue(path, data, keys, since)
+                continue
+            self.stats["writes"] += 1
+            self.stats["max_lag"] = max(self.stats["max_lag"], now - since)
+        self.stats["last_lag"] = round(max(now - since for _, _, since in dirty.values()), 3)
+        self.stats["max_lag"] = round(self.stats["max_lag"], 3)
+        self.stats["flushes"] += 1
+
+    def _requeue(self, path, data, keys, since):  # merged with whatever was marked since the batch was taken
+        entry = self.dirty.get(path)
+        if entry is None:
+            self.dirty[path] = [data, keys, since]
+            return
+        if keys is None or entry[1] is None:
+            entry[1] = None
+        else:
+            entry[1].update(keys)
+        entry[2] = min(entry[2], since)
+
+    def get_stats(self):
+        oldest = min((since for _, _, since in self.dirty.values()), default=None)
+        return {**self.stats, "pending": len(self.dirty), "lag": round(time.monotonic() - oldest, 3) if oldest else 0.0}
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.flush()
+        log.info(f"Final flush done, {self.stats['writes']} writes in {self.stats['flushes']} flushes.")
@@ -0,0 +1,34 @@
+# backend/test_c4.py
+# The incremental evaluator in c4.Board against score_position, the full-grid scan it replaces.
+
+import os, sys, random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import c4
+
+def test_incremental_scores_match_score_position():
+    """Board.score, kept up to date move by move, against score_position over the whole grid, on random games."""
+    rng = random.Random(0)
+    for _ in range(200):
+        board, played = c4.Board(), []
+        while not board.is_full():
+            piece = 1 + board.count % 2
+            col = rng.choice(board.valid_moves())
+            board.play(col, piece)
+            played.append(col)
+            grid = board.to_grid()
+            for p in (1, 2):
+                assert board.score(p) == c4.score_position(grid, p), (played, p)
+            if board.won(piece):
+                break
+        for col in reversed(played):
+            board.undo(col)
+        assert board.scores == [0, 0, 0] and not any(board.windows), played
+
+def test_bad_book_is_ignored(tmp_path):
+    board = c4.Board()
+    for contents in (b"", c4.BOOK_MAGIC[:2], c4.BOOK_HEADER.pack(c4.BOOK_MAGIC, 8, 3) + bytes(8)):
+        path = tmp_path / "book.bin"
+        path.write_bytes(contents)
+        assert c4.OpeningBook(str(path)).lookup(board) is None
+    assert c4.OpeningBook(str(tmp_path / "missing.bin")).lookup(board) is None
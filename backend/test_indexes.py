@@ -0,0 +1,72 @@
+# backend/test_indexes.py
+# The reverse indexes (pid_rooms, open_rooms, name_pid, pid_sids) against what check_indexes rebuilds from
+# the rooms and players, through the same calls the socket handlers make. app is imported in a scratch
+# directory, since it opens its files under db/ at import.
+
+import os, sys, tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp())
+os.makedirs("db/avatars")
+with open("db/avatars/a.svg", "w") as f:
+    f.write("<svg/>")
+
+import app
+import eventlet
+
+def settle():  # lets the actors run what the calls queued
+    for _ in range(100):
+        eventlet.sleep(0)
+        if not app.actors.inboxes:
+            return
+
+def register(pid, sid):
+    app.bind_sid(sid, pid, None)
+    app.register_player(pid, sid)
+
+def test_rooms_and_players():
+    register("P1", "s1")
+    register("P2", "s2")
+    app.add_room("rps", "r1", "P1", "waiting")
+    app.add_player("rps", "r1", "P1", False, "waiting")
+    app.add_player("rps", "r1", "P2", False, "waiting")
+    app.set_room_status("rps", "r1", "running")
+    assert app.pid_rooms["P2"] == {("rps", "r1")}
+    assert app.check_indexes() == []
+
+    app.clean_rooms_from_player("P2")
+    settle()
+    assert "P2" not in app.pid_rooms and "r1" in app.rooms["rps"]
+    assert app.check_indexes() == []
+
+    app.register_player("AI1", "no-sid")  # AIs are players too, save_game records their stats
+    app.add_room("c4", "r2", "P2", "running")
+    app.add_player("c4", "r2", "P2", False, "ready")
+    app.add_player("c4", "r2", "AI1", True, "ready")
+    app.rooms["c4"]["r2"].players["P2"].w = 2
+    app.rooms["c4"]["r2"].players["AI1"].l = 2
+    app.game_over("c4", "r2")
+    settle()
+    assert "r2" not in app.rooms["c4"] and "P2" not in app.pid_rooms
+    assert app.pid_player["P2"]["c4"] == {"w": 2, "l": 0, "r": 100.0}
+    assert app.pid_player["AI1"]["c4"] == {"w": 0, "l": 2, "r": 0.0}
+    games, _ = app.history.page("c4", player="P2")
+    assert [rid for rid, _ in games] == ["r2"] and set(games[0][1]["players"]) == {"P2", "AI1"}
+    assert app.check_indexes() == []
+
+    app.remove_room("rps", "r1")
+    assert not app.pid_rooms and not app.open_rooms["rps"]["running"]
+    app.bind_sid("s2", None, None)
+    assert "P2" not in app.pid_sids
+    assert app.check_indexes() == []
+    assert app.actors.stats["errors"] == 0
+
+def test_mismatch_is_reported():
+    app.pid_rooms["ghost"] = {("rps", "nowhere")}
+    try:
+        assert any(problem.startswith("pid_rooms") for problem in app.check_indexes())
+    finally:
+        del app.pid_rooms["ghost"]
+    assert app.check_indexes() == []
+
+def teardown_module():  # the last writes land in the scratch directory, before pytest changes back
+    app.flusher.close()
@@ -0,0 +1,29 @@
+# backend/test_leaderboard.py
+# The blocked Leaderboard against a plain sort of the same players, with blocks small enough to split and empty.
+
+import os, sys, random
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import leaderboard
+from leaderboard import Leaderboard
+
+def test_matches_full_sort(monkeypatch):
+    monkeypatch.setattr(leaderboard, "BLOCK_SIZE", 4)
+    rng = random.Random(0)
+    players = {f"P{i}": {"c4": {"w": rng.randrange(8), "l": rng.randrange(8), "r": rng.random()}} for i in range(60)}
+    board = Leaderboard("c4", min_games=5).build(players)
+    for step in range(2000):
+        pid = rng.choice(list(players))
+        w, l = rng.randrange(12), rng.randrange(12)
+        players[pid]["c4"] = stats = {"w": w, "l": l, "r": w / (w + l) if w + l else 0.0}
+        board.update(pid, stats)
+        if step % 50:
+            continue
+        ranked = sorted(Leaderboard._key(pid, p["c4"]) for pid, p in players.items()
+            if p["c4"]["w"] + p["c4"]["l"] >= 5)
+        order = [key[3] for key in ranked]
+        assert len(board) == len(order)
+        assert board.top(len(order) + 5) == order
+        assert board.top(7, 10) == order[10:17]
+        assert all(board.rank(pid) == i + 1 for i, pid in enumerate(order))
+        assert all(len(block) < 8 for block in board.blocks)
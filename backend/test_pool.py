@@ -0,0 +1,37 @@
+# backend/test_pool.py
+# SearchPool always calls back: dead idle workers are replaced, and a job that can't be sent reports None.
+
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import eventlet
+from pool import SearchPool
+
+def wait_for(got, n):
+    for _ in range(200):
+        if len(got) >= n:
+            return
+        eventlet.sleep(0.05)
+
+def test_dead_idle_workers_are_replaced():
+    pool = SearchPool(1)
+    try:
+        for proc in list(pool.idle.queue):
+            proc.kill()
+            proc.wait()
+        got = []
+        pool.submit("t", "get_ai_move", lambda: {"moves": [], "turn": 2, "budget_ms": 20}, got.append)
+        wait_for(got, 1)
+        assert len(got) == 1 and got[0]["col"] in range(7)
+    finally:
+        pool.close()
+
+def test_failed_args_call_back_none():
+    pool = SearchPool(1)
+    try:
+        got = []
+        pool.submit("t", "get_ai_move", lambda: 1 / 0, got.append)
+        wait_for(got, 1)
+        assert got == [None]
+    finally:
+        pool.close()
@@ -0,0 +1,28 @@
+# backend/test_store.py
+# A failed write in the Flusher is retried at the next flush instead of stopping the writes for good.
+
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from store import JournalStore, Flusher
+
+def test_failed_write_is_retried(tmp_path):
+    path = str(tmp_path / "players.json")
+    journal = JournalStore(path)
+    saved = {}
+    flusher = Flusher({path: journal}, saved.__setitem__, interval=3600)
+    try:
+        data = {"P1": 1}
+        os.mkdir(journal.log_path)  # appending to the log fails while it is a directory
+        flusher.mark(path, data, ["P1"])
+        flusher.flush()
+        assert flusher.stats["errors"] == 1 and flusher.get_stats()["pending"] == 1
+
+        os.rmdir(journal.log_path)
+        data["P2"] = 2
+        flusher.mark(path, data, ["P2"])
+        flusher.flush()
+        assert flusher.get_stats()["pending"] == 0 and flusher.thread.is_alive()
+        assert JournalStore(path).load(compact=False) == {"P1": 1, "P2": 2}
+    finally:
+        flusher.close()
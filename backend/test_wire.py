@@ -0,0 +1,41 @@
+# backend/test_wire.py
+# Live rooms encoded by the packer's default hook against their to_json(), and both decoded back as wire.js does.
+
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import msgpack
+import wire
+from room import Room, Player, OUT
+
+def decode(payload):  # wire.js: tags back to names, the grid ext back to rows
+    def names(pairs):
+        return {wire.TAGS[k] if isinstance(k, int) else k: v for k, v in pairs}
+    def ext(code, data):
+        assert code == wire.EXT_GRID
+        return [list(data[row * 7:row * 7 + 7]) for row in range(6)]
+    return msgpack.unpackb(payload, object_pairs_hook=names, ext_hook=ext, strict_map_key=False)
+
+def rooms():
+    c4 = Room("c4", "running")
+    c4.players["P1"] = Player("c4", 1, False, "ready")
+    c4.players["AI1"] = Player("c4", 2, True, "ready")
+    c4.rounds[0].moves = bytearray([3, 3, 4])
+    c4.grid[38], c4.grid[31], c4.grid[39] = 1, 2, 1
+    c4.winner = "P1"
+    rps = Room("rps", "waiting")
+    rps.players["P2"] = Player("rps", 1, False, "waiting")
+    rps.players["P2"].away = True
+    rps.rounds[0].steps = [["R", OUT]]
+    return {"r1": c4, "r2": rps}
+
+def test_live_rooms_encode_like_their_json():
+    live = rooms()
+    snapshot = {rid: room.to_json() for rid, room in live.items()}
+    patch = {"channel": "lobby:c4", "key": "rooms", "gid": "c4", "v": 3, "del": ["r0"]}
+    assert wire.encode({**patch, "set": live}) == wire.encode({**patch, "set": snapshot})
+    assert decode(wire.encode({**patch, "set": live})) == {**patch, "set": snapshot}
+
+def test_plain_values():
+    data = {"n": "x" * 40, "data": [1, -5, -200, 70000, 2 ** 40, -2 ** 40, 1.5, None, True, b"\x00\x01"], "other": {"w": 1}}
+    assert decode(wire.encode(data)) == data
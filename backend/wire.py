@@ -0,0 +1,79 @@
+# backend/wire.py
+# Binary encoding for clients that opt in with set_codec: MessagePack through the msgpack C packer, decoded by
+# frontend/src/wire.js. Known field names are sent as small integer tags and the c4 grid as one 42-byte ext value.
+
+import msgpack
+from room import Room, OUT
+
+CODEC = "msgpack"
+SUFFIX = "#b"  # channel suffix for binary subscribers
+
+# Tag i stands for TAGS[i] as a map key, kept in the same order as TAGS in wire.js.
+TAGS = ["status", "wins2win", "rsize", "max_spec", "spec", "players", "rounds", "index", "winner", "steps",
+    "moves", "grid", "team", "is_ai", "on", "cmove", "w", "l", "r", "n", "a", "rps", "c4", "date",
+    "channel", "key", "gid", "v", "set", "del", "data", "replace", "rid", "game_over"]
+TAG = {name: i for i, name in enumerate(TAGS)}
+_tag_of = TAG.get
+
+EXT_GRID = 1  # 6x7 c4 grid, row by row from the top, one byte per cell
+
+def _tags(*names):
+    return [TAG[name] for name in names]
+
+_ROOM_TAGS = _tags("status", "wins2win", "rsize", "max_spec", "spec", "players", "rounds", "grid", "winner")
+_PLAYER_TAGS = _tags("team", "is_ai", "status", "on", "cmove", "w", "l")
+_ROUND_TAGS = _tags("index", "winner", "steps", "moves")
+
+def _default(obj):
+    """Live rooms are encoded straight from their fields, in the shape of Room.to_json() with the keys
+    tagged, rather than building the to_json() dicts and tagging them after."""
+    if isinstance(obj, Room):
+        status, wins2win, rsize, max_spec, spec, players, rounds, grid, winner = _ROOM_TAGS
+        data = {status: obj.status, wins2win: obj.wins2win, rsize: obj.rsize, max_spec: obj.max_spec, spec: obj.spec,
+            players: {pid: _player(p) for pid, p in obj.players.items()}, rounds: [_round(r) for r in obj.rounds]}
+        if obj.grid is not None:
+            data[grid] = msgpack.ExtType(EXT_GRID, bytes(obj.grid))
+        if obj.winner:
+            data[winner] = obj.winner
+        return data
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+def _player(p):  # Player.to_json()
+    team, is_ai, status, on, cmove, w, l = _PLAYER_TAGS
+    if p.on is None:
+        data = {team: p.team, is_ai: p.is_ai, status: p.status, w: p.w, l: p.l}
+    else:
+        data = {team: p.team, is_ai: p.is_ai, status: p.status, on: p.on, cmove: p.cmove, w: p.w, l: p.l}
+    if p.away:
+        data["away"] = True
+    return data
+
+def _round(r):  # Round.to_json()
+    index, winner, steps, moves = _ROUND_TAGS
+    if r.moves is None:
+        return {index: r.index, winner: r.winner, steps: [["" if m == OUT else m for m in step] for step in r.steps]}
+    return {index: r.index, winner: r.winner, moves: list(r.moves)}
+
+_packer = msgpack.Packer(default=_default)
+
+def encode(obj):
+    """obj as MessagePack bytes. Plain dicts and lists get their keys tagged on the way, Room objects
+    are encoded by the packer's default hook."""
+    return _packer.pack(_tag(obj))
+
+def _tag(obj):
+    t = type(obj)
+    if t is dict:
+        out = {}
+        for k, v in obj.items():
+            tv = type(v)
+            if tv is dict or tv is list or tv is tuple:
+                if k == "grid" and len(v) == 6:
+                    v = msgpack.ExtType(EXT_GRID, bytes(c for row in v for c in row))
+                else:
+                    v = _tag(v)
+            out[_tag_of(k, k)] = v
+        return out
+    if t is list or t is tuple:
+        return [_tag(v) if type(v) in (dict, list, tuple) else v for v in obj]
+    return obj
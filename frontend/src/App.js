@@ -3,6 +3,7 @@
 import React, { useState, useEffect, useRef } from "react";
 import "./App.css";
 import { io } from "socket.io-client";
+import { CODEC, decode } from "./wire";
 
 const SERVER_URL = "http://57.129.44.194:5001";
 
@@ -30,6 +31,8 @@ function App() {
   const [avatar, setAvatar] = useState(null);
 
   const [lead, setLead] = useState([]);
+  const [leadStats, setLeadStats] = useState({});
+  const [myRank, setMyRank] = useState(null);
 
   const [leadSort, setLeadSort] = useState({ key: "w", direction: "desc" });
   const [lobbySort, setLobbySort] = useState({ key: "status", direction: "asc" });
@@ -39,11 +42,16 @@ function App() {
   const [pidPlayer, setPidPlayer] = useState({});
   const [roomsHist, setRoomsHist] = useState({});
   const [playerRoomsHist, setPlayerRoomsHist] = useState({});
+  const [histCursor, setHistCursor] = useState(null);
   const [rooms, setRooms] = useState({});
 
   const [roomRank, setRoomRank] = useState(0);
 
   const tableEndRef = useRef(null);
+  const versionsRef = useRef({});
+  const subscribedRef = useRef(new Set());
+  const requestedPidsRef = useRef(new Set());
+  const [connId, setConnId] = useState(0);
 
   const colors = ["#0AF", "#F00", "#0C3", "#DD0", "#B0D"]
 
@@ -53,71 +61,80 @@ function App() {
       reconnectionAttempts: 5,    // Optional: Limit reconnection attempts
     });
     setSocket(newSocket);
+    const on = (event, handler) => newSocket.on(event, d => handler(d instanceof ArrayBuffer || ArrayBuffer.isView(d) ? decode(d) : d));
 
-    newSocket.on("connect", () => {
+    on("connect", () => {
       console.log("Connected to backend");
+      newSocket.emit("set_codec", { codec: CODEC });
       const storedPid = localStorage.getItem("pid") || generatePid();
       localStorage.setItem("pid", storedPid);
       newSocket.emit("set_pid", { pid: storedPid });
+      versionsRef.current = {};
+      subscribedRef.current = new Set();
+      setConnId(prev => prev + 1);
     });
 
-    newSocket.on("pid_set", d => {
+    on("pid_set", d => {
       setPid(d.pid);
       setName(d.n);
       setAvatar(d.a);
       console.log(`pid successfully set to ${d.pid}`);
     });
 
-    newSocket.on("avatar_set", d => {
+    on("avatar_set", d => {
       setAvatar(d);
       console.log(`Avatar successfully updated from ${avatar} to ${d}`);
     });
 
     fetch(`${SERVER_URL}/avatars/batch`)
       .then(r => r.json())
-      .then(d => { setAvatarList(d) })
+      .then(d => { setAvatarList(Object.fromEntries(Object.entries(d).map(([k, url]) => [k, `${SERVER_URL}${url}`]))) })
       .catch(e => { console.error("Error fetching avatars/batch:", e) });
 
-    fetch(`${SERVER_URL}/players/batch`)
-      .then(r => r.json())
-      .then(d => { setPidPlayer(d) })
-      .catch(e => { console.error("Error fetching players/batch:", e) });
-
-    newSocket.on("room_created", d => {
+    on("room_created", d => {
       setRid(d);
       setGameState("lobby");
       console.log(`New room created: ${d}`);
     });
 
-    newSocket.on("link_checked", d => {
+    on("link_checked", d => {
       setRooms(d.rooms);
       setIsLinkValid(d.isLinkValid);
     });
 
-    newSocket.on("room_joined", d => {
+    on("room_joined", d => {
       setRid(d);
       setGameState("lobby");
       console.log(`New player in room ${d}`);
     });
 
-    newSocket.on("game_start", d => {
+    on("game_start", d => {
       setRid(d);
       setGameState("running");
       console.log(`Game started in room ${d}`);
     });
 
-    newSocket.on("help_move", d => {
-      setHelpMove(d);
-      console.log(`Help move: ${d}`);
+    on("session_resumed", d => {
+      setGid(d.gid);
+      setRid(d.rid);
+      setRooms(prev => ({ ...prev, [d.rid]: d.room }));
+      setGameState(d.room.status === "waiting" ? "lobby" : "running");
+      console.log(`Resumed in room ${d.rid}`);
+    });
+
+    on("help_move", d => {
+      setHelpMove(d.col);
+      setHelpScores(d);
+      console.log(`Help move: ${d.col} (depth ${d.depth})`);
     });
 
-    newSocket.on("player_left", d =>
+    on("player_left", d =>
       d.pid === pid
         ? console.log(`You left room ${d.rid}.`)
         : console.log(`Player ${d.pid} left room ${d.rid}.`)
     );
 
-    newSocket.on("game_result_rps", d => {
+    on("game_result_rps", d => {
       if (d.game_over) {
         console.log(`Game over in room ${d.rid}`);
         quitRoom(false);
@@ -128,7 +145,7 @@ function App() {
       }
     });
 
-    newSocket.on("game_result_c4", (d) => {
+    on("game_result_c4", (d) => {
       if (d.game_over) {
         console.log(`Game over in room ${d.rid}`);
         quitRoom(false);
@@ -138,18 +155,36 @@ function App() {
       }
     });
 
-    newSocket.on("db_updated", d => {
-      const setters = { "rooms": setRooms, "rooms_hist": setRoomsHist, "players": setPidPlayer };
-      const setter = setters[d.key];
-      if (setter) setter(d.data);
+    const setters = { "rooms": setRooms, "players": setPidPlayer, "rooms_hist": setRoomsHist, "lead": setLeadStats };
+
+    on("db_updated", d => {
+      const v = versionsRef.current[d.channel];
+      if (v === undefined || d.v <= v) return;  // not synced yet, or already included in the full copy
+      if (d.v !== v + 1) {
+        console.warn(`Missed ${d.channel} update ${v + 1}, resyncing.`);
+        delete versionsRef.current[d.channel];
+        return newSocket.emit("resync", { channel: d.channel });
+      }
+      versionsRef.current[d.channel] = d.v;
+      setters[d.key](prev => {
+        const next = { ...prev, ...d.set };
+        d.del.forEach(k => delete next[k]);
+        return next;
+      });
+    });
+
+    on("db_full", d => {
+      if (!subscribedRef.current.has(d.channel)) return;
+      versionsRef.current[d.channel] = d.v;
+      setters[d.key](prev => d.replace ? d.data : { ...prev, ...d.data });
     });
 
-    newSocket.on("warning", w => {
+    on("warning", w => {
       console.warn("Warning:", w.message || w);
       alert(`Warning: ${w.message || "WARNING"}`);
     });
 
-    newSocket.on("error", e => {
+    on("error", e => {
       console.error("Socket Error:", e.message || e);
       alert(`Error: ${e.message || "ERROR"}`);
       quitRoom(true);
@@ -167,8 +202,16 @@ function App() {
   //  #######   ######  ######## ######## ##       ##       ########  ######     ##   
 
   useEffect(() => {
-    sortList(leadSort.key, leadSort.direction, getLead(gid), setLead);
-  }, [pidPlayer, gid]);
+    sortList(leadSort.key, leadSort.direction, getLead(), setLead);
+  }, [pidPlayer, leadStats]);
+
+  useEffect(() => {
+    if (!displayLead || !gid || !pid) return;
+    fetch(`${SERVER_URL}/leaderboard/rank?gid=${gid}&pid=${pid}`)
+      .then(r => r.json())
+      .then(d => { setMyRank(d) })
+      .catch(e => { console.error("Error fetching leaderboard/rank:", e) });
+  }, [displayLead, gid, pid, leadStats]);
 
   useEffect(() => {
     sortDict(lobbySort.key, lobbySort.direction, rooms, setRooms);
@@ -182,6 +225,45 @@ function App() {
     setPlayerRoomsHist(Object.fromEntries(Object.entries(roomsHist).filter(([k, v]) => specPid in v.players)));
   }, [specPid, roomsHist]);
 
+  useEffect(() => {
+    const shown = [...Object.values(rooms), ...Object.values(roomsHist)].flatMap(r => Object.keys(r.players || {})).concat(Object.keys(leadStats));
+    const missing = [...new Set([pid, specPid, ...shown])].filter(p => p && !(p in pidPlayer) && !requestedPidsRef.current.has(p));
+    if (!missing.length) return;
+    missing.forEach(p => requestedPidsRef.current.add(p));
+    fetch(`${SERVER_URL}/players/batch?pids=${missing.map(encodeURIComponent).join(",")}`)
+      .then(r => r.json())
+      .then(d => { setPidPlayer(prev => ({ ...d, ...prev })) })
+      .catch(e => {
+        missing.forEach(p => requestedPidsRef.current.delete(p));
+        console.error("Error fetching players/batch:", e);
+      });
+  }, [pid, specPid, rooms, roomsHist, leadStats, pidPlayer]);
+
+  useEffect(() => {
+    if (!socket || !connId) return;
+    const wanted = new Set([
+      "players",
+      pid && `player:${pid}`,
+      specPid && `player:${specPid}`,
+      gid && displayLead && `leaderboard:${gid}`,
+      gid && gameState === "menu" && `lobby:${gid}`,
+      rid && `room:${rid}`,
+      specRid && `room:${specRid}`,
+    ].filter(Boolean));
+    const subscribed = subscribedRef.current;
+    subscribed.forEach(channel => {
+      if (wanted.has(channel)) return;
+      socket.emit("unsubscribe", { channel: channel });
+      subscribed.delete(channel);
+      delete versionsRef.current[channel];
+    });
+    wanted.forEach(channel => {
+      if (subscribed.has(channel)) return;
+      subscribed.add(channel);
+      socket.emit("subscribe", { channel: channel });
+    });
+  }, [socket, connId, pid, specPid, displayLead, gid, gameState, rid, specRid]);
+
   useEffect(() => {
     if (tableEndRef.current) {
       tableEndRef.current.scrollIntoView({ behavior: "smooth" });
@@ -270,18 +352,26 @@ function App() {
     setGameState("menu");
   };
 
-  const joinGame = (selected_gid, status) => {
-    fetch(`${SERVER_URL}/rooms/batch?gid=${selected_gid}`)
+  const fetchRoomsHist = (playerId, cursor) => {
+    const params = new URLSearchParams({ gid: gid, player: playerId, ...(cursor && { cursor: cursor }) });
+    fetch(`${SERVER_URL}/rooms/batch?${params}`)
       .then(r => r.json())
-      .then(d => { setRoomsHist(d) })
+      .then(d => {
+        setRoomsHist(prev => ({ ...prev, ...d.rooms }));
+        setHistCursor(d.next);
+      })
       .catch(e => { console.error("Error fetching rooms/batch:", e) });
+  };
+
+  const joinGame = (selected_gid, status) => {
     setGid(selected_gid);
     setGameState(status)
-    setLead(getLead(selected_gid));
+    setLeadStats({});
   };
 
   const quitGame = () => {
     setGid(null);
+    setRooms({});
     setRoomsHist({});
     setGameState("main");
   };
@@ -298,10 +388,9 @@ function App() {
     document.body.removeChild(textArea);
   };
 
-  const getLead = gid => {
-    return Object.keys(pidPlayer)
-      .filter(pid => gid in pidPlayer[pid])
-      .map(pid => ({ pid: pid, n: pidPlayer[pid].n, a: pidPlayer[pid].a, ...pidPlayer[pid][gid] }));
+  const getLead = () => {
+    return Object.entries(leadStats)
+      .map(([pid, stats]) => ({ pid: pid, n: pidPlayer[pid]?.n || "", a: pidPlayer[pid]?.a, ...stats }));
   };
 
   const sortList = (newKey, newDirection, table, setTable) => {
@@ -401,7 +490,9 @@ function App() {
     if (gameState != "main" && !playerId) {
       return setSpecPid(playerId);
     }
-    if (gameState != "main" && gid in pidPlayer[playerId]) {
+    if (gameState != "main" && gid in (pidPlayer[playerId] || {})) {
+      setHistCursor(null);
+      fetchRoomsHist(playerId);
       return setSpecPid(playerId);
     }
   };
@@ -449,6 +540,7 @@ function App() {
   const [movesCrop, setMovesCrop] = useState(0);
   const [navRound, setNavRound] = useState(0);
   const [helpMove, setHelpMove] = useState(null);
+  const [helpScores, setHelpScores] = useState(null);
   const [winningSequence, setWinningSequence] = useState(null);
 
   useEffect(() => {
@@ -488,6 +580,7 @@ function App() {
 
   const handleMoveC4 = col => {
     setHelpMove(null);
+    setHelpScores(null);
     socket.emit("make_move", { gid: gid, rid: rid, move: col });
   };
 
@@ -505,6 +598,13 @@ function App() {
     return newGrid;
   }
 
+  const formatHelpScore = (score, exact) => {
+    if (score === null) return "";
+    if (score >= 1e13) return "WIN";
+    if (score <= -1e13) return "LOSS";
+    return exact ? `${score}` : `≤${score}`;
+  };
+
   const detectWin = (grid, minConnected = 4) => {
     const numRows = grid.length;
     const numCols = grid[0].length;
@@ -754,7 +854,7 @@ function App() {
                       return (
                         <React.Fragment key={`${i}`}>
                           <td onClick={() => handleSpecPid(k)} style={{ cursor: "pointer", padding: "0" }}>
-                            <img className="avatar" src={avatarList[pidPlayer[k].a]} alt={`${pidPlayer[k].n}'s avatar`} />
+                            <img className="avatar" src={avatarList[pidPlayer[k]?.a]} alt={`${pidPlayer[k]?.n}'s avatar`} />
                           </td>
                           <td className={v.w === bestw ? "win" : ""} onClick={() => handleSpecPid(k)} style={{ cursor: "pointer" }}>{v.w}</td>
                         </React.Fragment>
@@ -776,7 +876,7 @@ function App() {
                         {players.map(([k, v], j) => (
                           <React.Fragment key={`${i}-${j}`}>
                             <td onClick={() => handleSpecPid(k)} style={{ cursor: "pointer", padding: "0" }}>
-                              <img className="avatar" src={avatarList[pidPlayer[k].a]} alt={`${pidPlayer[k].n}'s avatar`} />
+                              <img className="avatar" src={avatarList[pidPlayer[k]?.a]} alt={`${pidPlayer[k]?.n}'s avatar`} />
                             </td>
                             <td className={v.w === bestw ? "win" : ""} onClick={() => handleSpecPid(k)} style={{ cursor: "pointer" }}>{v.w}</td>
                           </React.Fragment>
@@ -800,6 +900,7 @@ function App() {
         <div className="button_container">
           <button className="button" style={{ cursor: "pointer" }}
             onClick={() => { handleSpecPid(null); setPlayerRoomsHist({}) }}>Back</button>
+          {histCursor && <button className="button" onClick={() => fetchRoomsHist(specPid, histCursor)}>More</button>}
         </div>
       </div>
     </>;
@@ -808,7 +909,7 @@ function App() {
   const renderLead = <>
     <div className="main_container">
       <div className="table_menu_container">
-        <div className="text_display">Lead</div>
+        <div className="text_display">Lead{myRank?.rank ? ` | You: #${myRank.rank}/${myRank.total}` : ""}</div>
         <div className="table_container">
           <table className="lead_table">
             <thead>
@@ -867,7 +968,7 @@ function App() {
               <th key={i}>
                 <div className="circle_wrapper" onClick={() => { handleSpecPid(k); handleSpecRid(null) }}
                   style={{ margin: "0.4vh 0.2vh 0.4vh 0", border: `2px solid ${colors[i]}` }}>
-                  <img src={avatarList[v.a || pidPlayer[k].a]} alt={`${k}'s avatar`} />
+                  <img src={avatarList[v.a || pidPlayer[k]?.a]} alt={`${k}'s avatar`} />
                 </div>
               </th>
             ))}
@@ -916,6 +1017,15 @@ function App() {
 
     return <div className="table_menu_container">
       <Connect4Canvas amIFirst={amIFirst} lastCol={lastCol} lastRow={lastRow} helpRow={helpRow}/>
+      {gameState === "running" && helpScores &&
+        <div style={{ display: "flex", width: 7 * 35, fontSize: "0.7em" }}>
+          {helpScores.scores.map((s, c) => (
+            <div key={c} style={{ width: 35, textAlign: "center", color: c === helpScores.col ? "#0F0" : "#FFF" }}>
+              {formatHelpScore(s, helpScores.exact[c])}
+            </div>
+          ))}
+        </div>
+      }
       <input type="range" min="0" max={allMovesLen - 1} className="slider"
         value={allMovesLen - 1 - movesCrop}
         onChange={(e) => setMovesCrop(allMovesLen - 1 - Number(e.target.value))}
@@ -1033,7 +1143,7 @@ function App() {
                         {Object.entries(r.players).map(([k, v], j) => (
                           <div key={`${i}-${j}`} className="circle_wrapper" onClick={() => handleSpecPid(k)}
                             style={{ cursor: "pointer", width: "3.3vh", height: "3.3vh", border: `2px solid ${v.status === "ready" ? "#0F0" : "#F00"}` }}>
-                            <img src={avatarList[pidPlayer[k].a]} alt={`${pidPlayer[k].n}'s avatar`} />
+                            <img src={avatarList[pidPlayer[k]?.a]} alt={`${pidPlayer[k]?.n}'s avatar`} />
                           </div>
                         ))}
                       </div>
@@ -1099,7 +1209,7 @@ function App() {
         <ul className="player_list">
           {rooms[rid]?.players &&
             Object.entries(rooms[rid].players).map(([k, v], i) => (
-              <li key={i}>{v.status === "ready" ? "🟢" : "🔴"} {pidPlayer[k].n}</li>
+              <li key={i}>{v.status === "ready" ? "🟢" : "🔴"} {pidPlayer[k]?.n}</li>
             ))}
         </ul>
         <button className="button" onClick={handleReady}>{isReady ? "Wait" : "Ready"}</button>
@@ -1147,7 +1257,7 @@ function App() {
         <ul className="player_list">
           {rooms[rid]?.players &&
             Object.entries(rooms[rid].players).map(([k, v], i) => (
-              <li key={i}>{v.cmove ? "🟢" : "🔴"} {pidPlayer[k].n}</li>
+              <li key={i}>{v.cmove ? "🟢" : "🔴"} {pidPlayer[k]?.n}</li>
             ))}
         </ul>
       </div>
@@ -0,0 +1,89 @@
+// frontend/src/wire.js
+// Decoder for the binary payloads of backend/wire.py (a MessagePack subset with tagged keys and a packed c4 grid).
+
+export const CODEC = "msgpack";
+
+// Same order as TAGS in backend/wire.py.
+const TAGS = ["status", "wins2win", "rsize", "max_spec", "spec", "players", "rounds", "index", "winner", "steps",
+  "moves", "grid", "team", "is_ai", "on", "cmove", "w", "l", "r", "n", "a", "rps", "c4", "date",
+  "channel", "key", "gid", "v", "set", "del", "data", "replace", "rid", "game_over"];
+
+const EXT_GRID = 1;
+const textDecoder = new TextDecoder();
+
+export const decode = payload => {
+  const bytes = payload instanceof ArrayBuffer ? new Uint8Array(payload) : payload;
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  const str = n => {
+    const s = textDecoder.decode(bytes.subarray(pos, pos + n));
+    pos += n;
+    return s;
+  };
+  const array = n => {
+    const a = new Array(n);
+    for (let i = 0; i < n; i++) a[i] = read();
+    return a;
+  };
+  const map = n => {
+    const m = {};
+    for (let i = 0; i < n; i++) {
+      const k = read();
+      m[typeof k === "number" ? TAGS[k] : k] = read();
+    }
+    return m;
+  };
+  const ext = n => {
+    const type = bytes[pos++];
+    const data = bytes.subarray(pos, pos + n);
+    pos += n;
+    if (type !== EXT_GRID) throw new Error(`Unknown ext type ${type}`);
+    return Array.from({ length: 6 }, (_, r) => Array.from(data.subarray(r * 7, r * 7 + 7)));
+  };
+  const bin = n => {
+    const b = bytes.slice(pos, pos + n);
+    pos += n;
+    return b;
+  };
+  const u8 = () => bytes[pos++];
+  const u16 = () => { pos += 2; return view.getUint16(pos - 2); };
+  const u32 = () => { pos += 4; return view.getUint32(pos - 4); };
+
+  const read = () => {
+    const b = bytes[pos++];
+    if (b < 0x80) return b;
+    if (b < 0x90) return map(b & 0x0f);
+    if (b < 0xa0) return array(b & 0x0f);
+    if (b < 0xc0) return str(b & 0x1f);
+    if (b >= 0xe0) return b - 0x100;
+    switch (b) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return bin(u8());
+      case 0xc5: return bin(u16());
+      case 0xc6: return bin(u32());
+      case 0xc7: return ext(u8());
+      case 0xcb: pos += 8; return view.getFloat64(pos - 8);
+      case 0xcc: return u8();
+      case 0xcd: return u16();
+      case 0xce: return u32();
+      case 0xcf: pos += 8; return Number(view.getBigUint64(pos - 8));
+      case 0xd0: pos += 1; return view.getInt8(pos - 1);
+      case 0xd1: pos += 2; return view.getInt16(pos - 2);
+      case 0xd2: pos += 4; return view.getInt32(pos - 4);
+      case 0xd3: pos += 8; return Number(view.getBigInt64(pos - 8));
+      case 0xd9: return str(u8());
+      case 0xda: return str(u16());
+      case 0xdb: return str(u32());
+      case 0xdc: return array(u16());
+      case 0xdd: return array(u32());
+      case 0xde: return map(u16());
+      case 0xdf: return map(u32());
+      default: throw new Error(`Unknown type byte 0x${b.toString(16)}`);
+    }
+  };
+
+  return read();
+};